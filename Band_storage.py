@@ -1,75 +1,312 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from datetime import datetime, timedelta
+import collections
+import functools
+import os
+import shutil
+import threading
+import time
 import uuid
 import subprocess
-import socket
-import random
+import requests
 
 
 app = Flask(__name__)
 CORS(app)  # Allow all domains by default
 
 
-# Multiple test hosts (mix of China-friendly and global)
-TEST_HOSTS = [
-    ("1.1.1.1", 53),          # Cloudflare DNS (may be blocked in China)
-    ("114.114.114.114", 53),  # China DNS (China-friendly)
-    ("8.8.8.8", 53),          # Google DNS (may be blocked)
-    ("223.5.5.5", 53)         # Alibaba DNS (China-friendly)
-]
+# ========= Bandwidth sampler =========
+SAMPLE_INTERVAL_SEC = 1.0                 # counter read period
+WINDOWS_SEC = (10, 60, 300, 900)          # selectable /bandwidth?window= values
+DEFAULT_WINDOW_SEC = 60
+# Interfaces to sum (comma separated); empty = every physical interface
+INTERFACES = [i for i in os.getenv("BANDWIDTH_INTERFACES", "").split(",") if i]
+# Name prefixes never summed by default: loopback, containers, bridges, tunnels and
+# VM adapters carry traffic that is also counted on the physical link
+EXCLUDE_PREFIXES = tuple(p for p in os.getenv(
+    "BANDWIDTH_EXCLUDE",
+    "lo,docker,veth,br-,virbr,vnet,tun,tap,vmnet,cni,flannel,cali,vEthernet,VirtualBox,VMware,Loopback",
+).split(",") if p)
+
+
+@functools.lru_cache(maxsize=256)
+def is_virtual(name):
+    """True for interfaces that only relay traffic already counted elsewhere."""
+    if name.startswith(EXCLUDE_PREFIXES):
+        return True
+    # Linux puts every software device (bridges, veth, tun, ...) under /sys/devices/virtual
+    link = os.path.join("/sys/class/net", name)
+    return os.path.exists(link) and "/devices/virtual/" in os.path.realpath(link)
+
+
+def read_netstat():
+    """{"total": (rx_bytes, tx_bytes)} from Windows' built-in `netstat -e`."""
+    out = subprocess.run(["netstat", "-e"], capture_output=True, text=True, timeout=5).stdout
+    for line in out.splitlines():
+        # The byte counters are the first row ending in two numbers (row label is localized)
+        fields = line.split()
+        if len(fields) >= 3 and fields[-1].isdigit() and fields[-2].isdigit():
+            return {"total": (int(fields[-2]), int(fields[-1]))}
+    raise RuntimeError("no byte counters in `netstat -e` output")
+
+
+def read_counters():
+    """{iface: (rx_bytes, tx_bytes)} from /proc/net/dev, else psutil, else `netstat -e` (Windows)."""
+    try:
+        counters = {}
+        with open("/proc/net/dev") as f:
+            for line in f.readlines()[2:]:
+                name, data = line.split(":", 1)
+                fields = data.split()
+                counters[name.strip()] = (int(fields[0]), int(fields[8]))
+        return counters
+    except OSError:
+        pass
+    try:
+        import psutil  # optional, per-interface counters on non-Linux hosts
+    except ImportError:
+        if os.name != "nt":
+            raise RuntimeError("no /proc/net/dev and psutil is not installed") from None
+        return read_netstat()
+    return {n: (c.bytes_recv, c.bytes_sent) for n, c in psutil.net_io_counters(pernic=True).items()}
+
+
+class BandwidthSampler(threading.Thread):
+    """
+    Samples interface byte counters every SAMPLE_INTERVAL_SEC into a ring
+    buffer and, after each sample, publishes current/average/peak rx/tx for
+    every window in WINDOWS_SEC, so a request is a dictionary lookup.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL_SEC, interfaces=INTERFACES):
+        super().__init__(name="bandwidth-sampler", daemon=True)
+        self.interval = interval
+        self.interfaces = interfaces
+        self.ring = collections.deque(maxlen=int(max(WINDOWS_SEC) / interval))
+        self.stats = {}            # window -> published stats (replaced, never mutated)
+        self.active = []
+        self.error = None          # why counters cannot be read right now, if they cannot
+
+    def _selected(self, counters):
+        if self.interfaces:
+            return {n: c for n, c in counters.items() if n in self.interfaces}
+        return {n: c for n, c in counters.items() if not is_virtual(n)}
+
+    def _publish(self):
+        samples = list(self.ring)
+        stats = {}
+        for window in WINDOWS_SEC:
+            recent = samples[-max(1, int(window / self.interval)):]
+            if not recent:
+                continue
+            rx = [s[1] for s in recent]
+            tx = [s[2] for s in recent]
+            stats[window] = {
+                "current": {"rx": rx[-1], "tx": tx[-1]},
+                "average": {"rx": sum(rx) / len(rx), "tx": sum(tx) / len(tx)},
+                "peak": {"rx": max(rx), "tx": max(tx)},
+                "samples": len(recent),
+                "updated": recent[-1][0],
+            }
+        self.stats = stats
+
+    def run(self):
+        prev = prev_t = None
+        while True:
+            try:
+                now = self._selected(read_counters())
+            except Exception as e:
+                # Keep retrying; report each distinct failure once
+                if str(e) != self.error:
+                    print(f"Bandwidth sampler could not read counters: {e}")
+                self.error = str(e)
+                time.sleep(self.interval)
+                continue
+            self.error = None
+            t = time.monotonic()
+            if prev is None:
+                # First reading is only the baseline for the next one
+                prev, prev_t = now, t
+                time.sleep(self.interval)
+                continue
+            elapsed = t - prev_t
+            rx = tx = 0
+            for name, (rx_bytes, tx_bytes) in now.items():
+                if name in prev:
+                    # A counter that went backwards was reset (link flap, driver reload)
+                    rx += max(0, rx_bytes - prev[name][0])
+                    tx += max(0, tx_bytes - prev[name][1])
+            self.ring.append((time.time(), rx * 8 / elapsed / 1e6, tx * 8 / elapsed / 1e6))
+            self.active = sorted(now)
+            prev, prev_t = now, t
+            self._publish()
+            time.sleep(self.interval)
+
+
+sampler = BandwidthSampler()
+sampler.start()
+
+
+def mbps(pair):
+    return {"rx": round(pair["rx"], 3), "tx": round(pair["tx"], 3)}
 
-def is_connected(timeout: float = 2.0) -> bool:
-    for host, port in TEST_HOSTS:
-        try:
-            socket.create_connection((host, port), timeout=timeout)
-            return True  # If any host works, we’re online
-        except OSError:
-            continue
-    return False
 
 @app.route('/bandwidth', methods=['GET'])
 def get_bandwidth():
     range_value = 100
+    window = request.args.get("window", default=DEFAULT_WINDOW_SEC, type=int)
+    if window not in WINDOWS_SEC:
+        return jsonify({"success": False, "message": f"window must be one of {list(WINDOWS_SEC)}"}), 400
 
-    if not is_connected():
-        speed_value = 0.0
+    stats = sampler.stats.get(window)
+    if stats is None and sampler.error:
+        # No counters on this host: keep the response dashboards already read, flagged as such
+        data = {"range": range_value, "speed": 0.0, "unit": "Mbps", "window_sec": window,
+                "samples": 0, "status": "unavailable", "message": f"Bandwidth unavailable: {sampler.error}"}
+    elif stats is None:
+        # Sampler has not completed its first interval yet
+        data = {"range": range_value, "speed": 0.0, "unit": "Mbps", "window_sec": window, "samples": 0}
     else:
-        # Generate a random float between 0.5 and 1.5 Mbps
-        speed_value = round(random.uniform(0.5, 1.5), 2)
-
-    response = {
-        "data": {
+        current = stats["current"]
+        data = {
             "range": range_value,
-            "speed": speed_value,
-            "unit": "Mbps"
-        },
-        "success": True
-    }
-    return jsonify(response), 200
+            "speed": round(current["rx"] + current["tx"], 2),   # combined throughput right now
+            "unit": "Mbps",
+            "window_sec": window,
+            "current": mbps(current),
+            "average": mbps(stats["average"]),
+            "peak": mbps(stats["peak"]),
+            "samples": stats["samples"],
+            "interfaces": sampler.active,
+            "updated": datetime.fromtimestamp(stats["updated"]).strftime("%H:%M:%S %d-%m-%Y"),
+        }
+    return jsonify({"data": data, "success": True}), 200
 
 
 
-@app.route('/storage', methods=['GET'])
-def storage_dummy():
-    dummy_data = {
-        "data": {
-            "mdc": {
-                "free_storage": 236,
-                "total_storage": 256,
-                "used_storage": 20,
-                "unit": "Gb"
-            },
-            "transbox": {
-                "free_storage": 153,
-                "total_storage": 256,
-                "used_storage": 103,
-                "unit": "Gb"
+# ========= Storage refresher =========
+STORAGE_REFRESH_SEC = 30.0                # local statvfs period
+REMOTE_REFRESH_SEC = 60.0                 # remote node period
+REMOTE_TIMEOUT_SEC = 3.0
+GROWTH_WINDOW_SEC = 3600.0                # growth rate is measured over this much history
+GB = 1024 ** 3
+
+
+def parse_pairs(value):
+    """"a=x,b=y" -> {"a": "x", "b": "y"}"""
+    return dict(item.split("=", 1) for item in value.split(",") if "=" in item)
+
+
+# name -> path on this node (the payload and database volumes get time-to-full)
+STORAGE_VOLUMES = parse_pairs(os.getenv(
+    "STORAGE_VOLUMES",
+    f"transbox={os.path.abspath(os.sep)},"
+    f"payload={os.getenv('PAYLOAD_DIR', './payload')},"
+    f"database={os.path.dirname(os.path.abspath('mydatabase.db'))}",
+))
+# name -> /storage/local URL of another node running this service
+STORAGE_REMOTE = parse_pairs(os.getenv("STORAGE_REMOTE", "mdc=http://172.168.0.80:5003/storage/local"))
+
+
+def disk_usage(path):
+    """(total, used, free) bytes of the filesystem holding path."""
+    if hasattr(os, "statvfs"):
+        st = os.statvfs(path)
+        total = st.f_blocks * st.f_frsize
+        free = st.f_bavail * st.f_frsize
+        return total, total - st.f_bfree * st.f_frsize, free
+    return shutil.disk_usage(path)
+
+
+class StorageRefresher(threading.Thread):
+    """
+    Refreshes local volumes (statvfs) every STORAGE_REFRESH_SEC and remote
+    nodes every REMOTE_REFRESH_SEC, keeping GROWTH_WINDOW_SEC of used-bytes
+    history per local volume for the growth rate. Requests read self.local /
+    self.remote, which are replaced whole, never mutated.
+    """
+
+    def __init__(self, volumes=STORAGE_VOLUMES, remote=STORAGE_REMOTE):
+        super().__init__(name="storage-refresher", daemon=True)
+        self.volumes = volumes
+        self.remote_urls = remote
+        self.history = {name: collections.deque() for name in volumes}
+        self.local = {}
+        self.remote = {}
+        self.session = requests.Session()
+
+    def refresh_local(self):
+        now = time.time()
+        local = {}
+        for name, path in self.volumes.items():
+            try:
+                total, used, free = disk_usage(path)
+            except OSError as e:
+                local[name] = {"available": False, "path": path, "message": str(e)}
+                continue
+            history = self.history[name]
+            history.append((now, used))
+            while now - history[0][0] > GROWTH_WINDOW_SEC:
+                history.popleft()
+            growth = None                     # bytes per second
+            if len(history) > 1 and now > history[0][0]:
+                growth = (used - history[0][1]) / (now - history[0][0])
+            local[name] = {
+                "available": True,
+                "path": path,
+                "free_storage": round(free / GB, 1),
+                "total_storage": round(total / GB, 1),
+                "used_storage": round(used / GB, 1),
+                "unit": "Gb",
+                "growth_gb_per_hour": round(growth * 3600 / GB, 3) if growth is not None else None,
+                "time_to_full_hours": round(free / growth / 3600, 1) if growth and growth > 0 else None,
+                "updated": datetime.fromtimestamp(now).strftime("%H:%M:%S %d-%m-%Y"),
             }
-        },
-        "success": True
-    }
-    return jsonify(dummy_data), 200
+        self.local = local
+
+    def refresh_remote(self):
+        remote = {}
+        for name, url in self.remote_urls.items():
+            try:
+                resp = self.session.get(url, timeout=REMOTE_TIMEOUT_SEC)
+                resp.raise_for_status()
+                volumes = resp.json()["data"]
+                # A node reports its root volume under its own "transbox" name
+                reading = volumes.get("transbox") or next(iter(volumes.values()))
+                remote[name] = {**reading, "stale": False}
+            except Exception as e:
+                last = self.remote.get(name)
+                remote[name] = {**last, "stale": True} if last else {"available": False, "message": str(e)}
+        self.remote = remote
+
+    def run(self):
+        next_remote = 0.0
+        while True:
+            try:
+                self.refresh_local()
+                if self.remote_urls and time.time() >= next_remote:
+                    self.refresh_remote()
+                    next_remote = time.time() + REMOTE_REFRESH_SEC
+            except Exception as e:
+                print(f"Storage refresher failed: {e}")
+            time.sleep(STORAGE_REFRESH_SEC)
+
+
+storage = StorageRefresher()
+storage.start()
+
+
+@app.route('/storage', methods=['GET'])
+def get_storage():
+    # Served from the refresher's cache: no filesystem or network I/O here
+    return jsonify({"data": {**storage.remote, **storage.local}, "success": True}), 200
+
+
+@app.route('/storage/local', methods=['GET'])
+def get_storage_local():
+    """This node's volumes only (what other nodes poll through STORAGE_REMOTE)."""
+    return jsonify({"data": storage.local, "success": True}), 200
 
 
 if __name__ == '__main__':
@@ -1,73 +1,101 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
-import subprocess
-import platform
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os, threading, time
+import probe_engine
+import monitor
 
 app = Flask(__name__)
 CORS(app)  # Allow all domains by default
 
-HOSTS = [
-    {"name": "MDC",    "ip": "172.168.0.80"},
-    {"name": "PRAXIX", "ip": "192.168.1.101"},
-]
+# Hosts are probed by the shared monitor (monitor.HOSTS) on their own adaptive
+# intervals; /ping answers from its latest results instead of probing per request.
+HOSTS = monitor.HOSTS
 
 # ---- Tunables ----
 PING_COUNT = 1                 # one echo is enough for liveness
-PING_TIMEOUT_MS = 600          # per-echo timeout (Windows) in milliseconds
-SUBPROC_HARD_TIMEOUT = 2.0     # absolute cap per ping subprocess (seconds)
-MAX_WORKERS = min(8, max(1, len(HOSTS)))  # parallelism for pings
+PING_TIMEOUT_MS = 600          # per-echo timeout in milliseconds
+PING_MAX_AGE_SEC = float(os.getenv("PING_MAX_AGE_SEC", "3"))   # freshness budget for cached results
 
-def _build_ping_cmd(ip: str):
-    """Build a cross-platform ping command with explicit timeouts."""
-    system = platform.system().lower()
-    if "windows" in system:
-        # -n (count), -w (timeout per reply, ms)
-        return ["ping", "-n", str(PING_COUNT), "-w", str(PING_TIMEOUT_MS), ip]
-    else:
-        # -c (count), -W (timeout per reply, seconds)
-        per_reply_sec = max(1, int(round(PING_TIMEOUT_MS / 1000.0)))
-        return ["ping", "-c", str(PING_COUNT), "-W", str(per_reply_sec), ip]
+# ========= Cache =========
+# ip -> (checked_epoch, up, rtt_ms, loss) from probes run here; the monitor's
+# results are merged in on read and whichever is newer wins.
+cache_lock = threading.Lock()
+probe_cache = {}
+_flight = None                 # Event of the probe currently running, shared by every waiter
 
-def ping_host(ip: str) -> bool:
-    """Ping a host and return True if reachable (exit code 0)."""
+monitor.start()
+
+def cached_results():
+    results = {
+        s["ip"]: (s["last_result_ts"].timestamp(), s["last_ping_ok"], s["last_rtt_ms"], s["last_loss"])
+        for s in monitor.host_rows() if s["last_result_ts"] is not None
+    }
+    with cache_lock:
+        for ip, r in probe_cache.items():
+            if ip not in results or r[0] > results[ip][0]:
+                results[ip] = r
+    return results
+
+def probe_all():
+    """
+    Probe every host, single-flight: while one probe runs, other callers
+    wait for its result instead of starting their own.
+    """
+    global _flight
+    with cache_lock:
+        flight, leader = (_flight, False) if _flight else (threading.Event(), True)
+        if leader:
+            _flight = flight
+    if not leader:
+        # As long as the leader can take: the engine's own cap on probe_many
+        flight.wait(probe_engine.probe_deadline(len(HOSTS), PING_COUNT, PING_TIMEOUT_MS / 1000.0) + 0.5)
+        return
     try:
-        result = subprocess.run(
-            _build_ping_cmd(ip),
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=SUBPROC_HARD_TIMEOUT
+        probes = probe_engine.probe_many(
+            [h["ip"] for h in HOSTS], count=PING_COUNT, timeout=PING_TIMEOUT_MS / 1000.0
         )
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        return False
-    except Exception:
-        # If ping is missing or any other OS error occurs, treat as down
-        return False
+        checked = time.time()
+        with cache_lock:
+            for ip, r in probes.items():
+                probe_cache[ip] = (checked, r.up, r.avg_rtt_ms, r.loss)
+    finally:
+        with cache_lock:
+            _flight = None
+        flight.set()
 
 @app.route('/ping', methods=['GET'])
 def ping_real():
+    """Hosts' reachability from cache; ?fresh=1 forces a probe before answering."""
     now_str = datetime.now().strftime("%H:%M:%S %d-%m-%Y")
     results = []
     alerts = []
 
-    # Run pings in parallel to keep endpoint responsive
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_map = {executor.submit(ping_host, h["ip"]): h for h in HOSTS}
-        for future in as_completed(future_map):
-            host = future_map[future]
-            status = bool(future.result())
-            results.append({
-                "host_name": host["name"],
-                "host": host["ip"],
-                "status": status
+    latest = cached_results()
+    now = time.time()
+    stale = any(
+        h["ip"] not in latest or now - latest[h["ip"]][0] > PING_MAX_AGE_SEC for h in HOSTS
+    )
+    if stale or request.args.get("fresh") in ("1", "true"):
+        probe_all()
+        latest = cached_results()
+        now = time.time()
+
+    for host in HOSTS:
+        checked, status, rtt_ms, loss = latest.get(host["ip"], (None, False, None, None))
+        results.append({
+            "host_name": host["name"],
+            "host": host["ip"],
+            "status": bool(status),
+            "rtt_ms": rtt_ms,
+            "loss": loss,
+            "age_sec": round(now - checked, 2) if checked else None,
+        })
+        if not status:
+            alerts.append({
+                "label": f"{host['name']} Disconnected.",
+                "time": now_str
             })
-            if not status:
-                alerts.append({
-                    "label": f"{host['name']} Disconnected.",
-                    "time": now_str
-                })
 
     return jsonify({
         "data": results,
@@ -78,4 +106,4 @@ def ping_real():
 if __name__ == '__main__':
     # 0.0.0.0 listens on all interfaces; change to 127.0.0.1 for local only.
     app.run(host='172.168.0.81', port=5006, debug=False)
-    
+
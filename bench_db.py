@@ -0,0 +1,66 @@
+"""
+Per-request latency of the telemetry API (db.py) through Flask's test client.
+
+    python bench_db.py [path/to/db.py] [requests]
+
+Runs against a scratch database in a temp dir so the real one is untouched.
+"""
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def load_app(path):
+    spec = importlib.util.spec_from_file_location("bench_db_target", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<8} n={len(samples):<6} p50={statistics.median(samples):7.3f} ms  p99={p99:7.3f} ms")
+
+
+def main():
+    path = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "db.py"))
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_db_"))
+    client = load_app(path).test_client()
+    base = datetime(2025, 1, 1)
+    timings = {"create": [], "list": [], "update": []}
+
+    for i in range(n):
+        created_on = (base + timedelta(minutes=i)).isoformat()
+        t0 = time.perf_counter()
+        client.post("/api/table/create", json={
+            "CreatedOn": created_on,
+            "FileName": f"NDCTELE_{i}.json",
+            "TransmissionStatus": "Not Processed",
+        })
+        t1 = time.perf_counter()
+        client.get("/api/table/")
+        t2 = time.perf_counter()
+        client.put("/api/table/update", json={
+            "CreatedOn": created_on,
+            "TransmissionStatus": "Processed",
+            "ModifiedOn": datetime.now().replace(microsecond=0).isoformat(),
+        })
+        t3 = time.perf_counter()
+        timings["create"].append((t1 - t0) * 1000)
+        timings["list"].append((t2 - t1) * 1000)
+        timings["update"].append((t3 - t2) * 1000)
+
+    print(f"{path} ({n} rows)")
+    for name, samples in timings.items():
+        report(name, samples)
+
+
+if __name__ == "__main__":
+    main()
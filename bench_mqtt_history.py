@@ -0,0 +1,74 @@
+"""
+Trend query over a week of per-second register data: the columnar store
+(mqtt_store.history) against replaying the same rows as JSON lines, which is
+what answering from per-snapshot files amounts to.
+
+    python bench_mqtt_history.py [registers]
+"""
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import mqtt_store
+
+DAYS = 7
+REGISTERS = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+KEYS = [f"reg_{i}" for i in range(5)]
+POINTS = 600
+
+
+def build(directory, t0):
+    """Write DAYS of per-second rows through the writer, a day-sized block at a time."""
+    writer = mqtt_store.StoreWriter(directory, flush_rows=3600, flush_sec=math.inf)
+    rng = np.random.default_rng(1)
+    for day in range(DAYS):
+        ts = t0 + day * 86400 + np.arange(86400, dtype=np.float64)
+        values = np.cumsum(rng.normal(size=(86400, REGISTERS)), axis=0).round(2)
+        names = [f"reg_{i}" for i in range(REGISTERS)]
+        for t, row in zip(ts.tolist(), values.tolist()):
+            writer.append(dict(zip(names, row)), t)
+    writer.close()
+
+
+def json_lines_baseline(directory, t0):
+    """Scan one JSON line per row (first day only; scaled to the week)."""
+    path = os.path.join(directory, "rows.ndjson")
+    times, columns = mqtt_store._slice(directory, [f"reg_{i}" for i in range(REGISTERS)], t0, t0 + 86400)
+    with open(path, "w") as f:
+        for i, t in enumerate(times.tolist()):
+            f.write(json.dumps({"t": t, "data": {k: float(v[i]) for k, v in columns.items()}}) + "\n")
+    start = time.perf_counter()
+    sums = {}
+    with open(path) as f:
+        for line in f:
+            row = json.loads(line)
+            bucket = int((row["t"] - t0) // (DAYS * 86400 / POINTS))
+            for key in KEYS:
+                sums.setdefault((key, bucket), []).append(row["data"][key])
+    return (time.perf_counter() - start) * DAYS
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp(prefix="mqtt_history_bench_")
+    t0 = time.mktime((2026, 10, 1, 0, 0, 0, 0, 0, -1))
+    start = time.perf_counter()
+    build(directory, t0)
+    print(f"Ingested {DAYS * 86400} rows x {REGISTERS} registers in {time.perf_counter() - start:.1f}s")
+
+    end = t0 + DAYS * 86400
+    runs = []
+    for _ in range(5):
+        start = time.perf_counter()
+        result = mqtt_store.history(directory, KEYS, t0, end, (end - t0) / POINTS)
+        runs.append(time.perf_counter() - start)
+    body = json.dumps(result)
+    print(f"Columnar store: {len(result['t'])} buckets x {len(KEYS)} keys, "
+          f"first {runs[0] * 1000:.1f} ms, best {min(runs) * 1000:.1f} ms, {len(body) / 1024:.0f} KiB")
+    print(f"JSON lines scan (estimated for the week): {json_lines_baseline(directory, t0):.1f} s")
+    shutil.rmtree(directory)
@@ -0,0 +1,101 @@
+"""
+Lockstep sweeps vs the adaptive per-host scheduler, on a simulated clock.
+
+    python bench_scheduler.py [hosts] [seconds]
+
+Every host answers in 5 ms except one high-latency host (800 ms). Every 30 s
+one random host goes down for 20 s; a down host costs a full probe timeout.
+
+  lockstep  the old loop: probe every host, wait for the slowest, sleep SWEEP_PERIOD_SEC
+  adaptive  monitor.ProbeScheduler driven tick by tick
+
+Reports probes per host per second and outage-to-alert detection latency.
+"""
+import heapq
+import sys
+
+import numpy as np
+
+from monitor import PING_TIMEOUT_MS, SWEEP_PERIOD_SEC, TICK_SEC, HostTable, ProbeScheduler
+
+UP_RTT_SEC = 0.005
+SLOW_RTT_SEC = 0.8
+OUTAGE_EVERY_SEC = 30.0
+OUTAGE_SEC = 20.0
+
+
+def outages(n, seconds, rng):
+    return [(t, int(rng.integers(1, n))) for t in np.arange(10.0, seconds - OUTAGE_SEC, OUTAGE_EVERY_SEC)]
+
+
+def is_down(host, t, plan):
+    return any(h == host and start <= t < start + OUTAGE_SEC for start, h in plan)
+
+
+def probe_time(host, down):
+    if down:
+        return PING_TIMEOUT_MS / 1000.0
+    return SLOW_RTT_SEC if host == 0 else UP_RTT_SEC
+
+
+def detections(raised_at, plan):
+    latency = []
+    for start, host in plan:
+        hits = [t for h, t in raised_at if h == host and start <= t <= start + OUTAGE_SEC]
+        if hits:
+            latency.append(min(hits) - start)
+    return latency
+
+
+def lockstep(n, seconds, plan):
+    table = HostTable([{"name": str(i), "ip": str(i)} for i in range(n)])
+    t, probes, raised_at = 0.0, 0, []
+    while t < seconds:
+        down = np.array([is_down(i, t, plan) for i in range(n)])
+        t += max(probe_time(i, down[i]) for i in range(n))
+        before = table.alert_active.copy()
+        table.apply_hysteresis(~down, t)
+        raised_at += [(i, t) for i in np.flatnonzero(table.alert_active & ~before)]
+        probes += n
+        t += SWEEP_PERIOD_SEC
+    return probes, detections(raised_at, plan)
+
+
+def adaptive(n, seconds, plan):
+    table = HostTable([{"name": str(i), "ip": str(i)} for i in range(n)])
+    scheduler = ProbeScheduler(table, 0.0)
+    pending = []           # (finish time, seq, idx, up)
+    t, seq, probes, raised_at = 0.0, 0, 0, []
+    while t < seconds:
+        idx = scheduler.due(t)
+        if len(idx):
+            down = np.array([is_down(i, t, plan) for i in idx])
+            finish = t + max(probe_time(i, d) for i, d in zip(idx, down))
+            heapq.heappush(pending, (finish, seq, idx, ~down))
+            seq += 1
+            probes += len(idx)
+        while pending and pending[0][0] <= t:
+            _, _, done, up = heapq.heappop(pending)
+            before = table.alert_active[done].copy()
+            scheduler.complete(done, up, t)
+            raised_at += [(int(i), t) for i in done[table.alert_active[done] & ~before]]
+        t += TICK_SEC
+    return probes, detections(raised_at, plan)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 600.0
+    rng = np.random.default_rng(0)
+    np.random.seed(0)          # ProbeScheduler's phases and jitter come from NumPy's global RNG
+    plan = outages(n, seconds, rng)
+    print(f"{n} hosts, {seconds:.0f} s simulated, {len(plan)} outages")
+    print(f"{'':<9} {'probes/host/s':>14} {'detect mean s':>14} {'detect max s':>13}")
+    for name, run in (("lockstep", lockstep), ("adaptive", adaptive)):
+        probes, latency = run(n, seconds, plan)
+        print(f"{name:<9} {probes / n / seconds:>14.2f} {np.mean(latency):>14.2f} {np.max(latency):>13.2f}"
+              f"   ({len(latency)}/{len(plan)} detected)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Streamer transport throughput against a local stand-in for the db.py API.
+
+    python bench_streamer.py [records] [latency_ms]
+
+The stand-in answers /api/table/create and /api/table/create/batch after an
+artificial delay (the uplink RTT). Three senders are compared:
+
+  blocking  one requests.post per record inside a coroutine (the old streamer)
+  async-1   AsyncTransport, one record per request, MAX_IN_FLIGHT in flight
+  async     AsyncTransport, BATCH_SIZE records per request, MAX_IN_FLIGHT in flight
+
+Also reports the worst event-loop stall seen by a 10 ms ticker while sending.
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_transport import AsyncTransport
+
+BATCH_SIZE = 100
+MAX_IN_FLIGHT = 4
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.latency)
+        if self.path.endswith("/batch"):
+            records = body["records"]
+            reply = {"success": True, "results": [{"index": i, "success": True} for i in range(len(records))]}
+        else:
+            reply = {"success": True, "message": "Row inserted successfully"}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def records(n):
+    return [{"CreatedOn": f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}", "FileName": f"NDCTELE_{i}.json",
+             "TransmissionStatus": "Processed"} for i in range(n)]
+
+
+async def measure(sender):
+    stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal stall
+        while not done.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stall = max(stall, time.perf_counter() - t - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.02)   # let the ticker arm
+    t0 = time.perf_counter()
+    await sender()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await tick
+    return elapsed, stall
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    StandIn.latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50.0) / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}/api/table/create"
+    rows = records(n)
+
+    async def blocking():
+        for row in rows:
+            requests.post(base, json=row, timeout=10)
+
+    async def per_record():
+        transport = AsyncTransport(max_in_flight=MAX_IN_FLIGHT)
+        await asyncio.gather(*(transport.post(base, row) for row in rows))
+        transport.close()
+
+    async def pipelined():
+        transport = AsyncTransport(max_in_flight=MAX_IN_FLIGHT)
+        chunks = [rows[i:i + BATCH_SIZE] for i in range(0, n, BATCH_SIZE)]
+        await asyncio.gather(*(transport.post(base + "/batch", {"records": c}) for c in chunks))
+        transport.close()
+
+    print(f"{n} records, {StandIn.latency * 1000:.0f} ms simulated latency")
+    for name, sender in (("blocking", blocking), ("async-1", per_record), ("async", pipelined)):
+        elapsed, stall = await measure(sender)
+        print(f"{name:<9} {elapsed:8.2f} s  {n / elapsed:10.0f} rec/s  worst loop stall {stall * 1000:8.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,30 +1,202 @@
+import collections
+import gzip
+import hashlib
+import json
 import os
-import shutil
 import time
 from datetime import datetime
+from mqtt_archive import ArchiveWriter
 
 # Paths
-source_file = r"C:\Mqtt\__data\mqtt_live_data.json"
-destination_folder = r"C:\Payloads\1036991\Processed\MDC"
+source_file = os.getenv("MQTT_SOURCE_FILE", r"C:\Mqtt\__data\mqtt_live_data.json")
+destination_folder = os.getenv("MQTT_ARCHIVE_DIR", r"C:\Payloads\1036991\Processed\MDC")
+
+# ---- Tunables ----
+POLL_SEC = 1.0                     # how often the source is stat()ed for changes
+MIN_SNAPSHOT_INTERVAL_SEC = 60.0   # at most one snapshot per this long (latest content wins)
+SETTLE_SEC = 0.5                   # source must be unchanged this long before it is read
+SETTLE_MAX_TRIES = 5               # ... but a source rewritten faster than that is read anyway after this many tries
+COMPRESS = os.getenv("MQTT_ARCHIVE_COMPRESS", "1") == "1"                  # gzip new content
+RETENTION_DAYS = float(os.getenv("MQTT_ARCHIVE_RETENTION_DAYS", "30"))     # 0 = keep forever
+MAX_BYTES = int(float(os.getenv("MQTT_ARCHIVE_MAX_MB", "2048")) * 1024 * 1024)   # 0 = no size budget
+RECENT_CONTENTS = 64               # content hashes remembered for hardlinking
+# "files": one Mdc_Tele_<time>.json[.gz] per snapshot (what downstream consumers read today)
+# "delta": keyframes + changed keys only, in day files under MQTT_DELTA_DIR (see mqtt_archive.py)
+# "both":  write both while consumers move over
+ARCHIVE_FORMAT = os.getenv("MQTT_ARCHIVE_FORMAT", "files")
+delta_folder = os.getenv("MQTT_DELTA_DIR", os.path.join(destination_folder, "delta"))
+
+base_name = "Mdc_Tele"
+TIME_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+# Archived content by hash (newest last): sha256 -> archive path
+recent = collections.OrderedDict()
+last_signature = None
+unsettled = 0                      # consecutive reads skipped because the source was still changing
+delta_writer = ArchiveWriter(delta_folder) if ARCHIVE_FORMAT in ("delta", "both") else None
+
+
+def file_signature(path=source_file):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def read_archive(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read()
+
+
+def archived_files():
+    """(time, path) of every snapshot in the archive, oldest first."""
+    out = []
+    for entry in os.scandir(destination_folder):
+        name = entry.name
+        if not name.startswith(base_name + "_"):
+            continue
+        stamp = name[len(base_name) + 1:].split(".", 1)[0]
+        try:
+            out.append((datetime.strptime(stamp, TIME_FORMAT), entry.path))
+        except ValueError:
+            continue
+    return sorted(out)
+
+
+def remember(digest, path):
+    recent[digest] = path
+    recent.move_to_end(digest)
+    while len(recent) > RECENT_CONTENTS:
+        recent.popitem(last=False)
+
+
+def store(data, digest, destination_base):
+    """Write a snapshot: hardlink to identical archived content if possible, else a (compressed) copy."""
+    previous = recent.get(digest)
+    if previous and os.path.exists(previous):
+        destination = destination_base + (".json.gz" if previous.endswith(".json.gz") else ".json")
+        try:
+            os.link(previous, destination)
+            return destination, "linked"
+        except OSError:
+            pass   # no hardlinks on this volume (e.g. FAT): fall through to a normal copy
+
+    destination = destination_base + (".json.gz" if COMPRESS else ".json")
+    tmp = os.path.join(destination_folder, "." + os.path.basename(destination) + ".tmp")
+    if COMPRESS:
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(data)
+    else:
+        with open(tmp, "wb") as f:
+            f.write(data)
+    os.replace(tmp, destination)
+    return destination, "stored"
+
+
+def enforce_budget():
+    """Delete the oldest snapshots past RETENTION_DAYS or beyond MAX_BYTES (hardlinks counted once)."""
+    files = archived_files()
+    now = datetime.now()
+    removed = 0
+    if RETENTION_DAYS:
+        while files and (now - files[0][0]).total_seconds() > RETENTION_DAYS * 86400:
+            os.remove(files.pop(0)[1])
+            removed += 1
+    if MAX_BYTES:
+        inodes = collections.Counter()
+        sizes = {}
+        for _, path in files:
+            st = os.stat(path)
+            inodes[(st.st_dev, st.st_ino)] += 1
+            sizes[(st.st_dev, st.st_ino)] = st.st_size
+        total = sum(sizes.values())
+        while files and total > MAX_BYTES:
+            _, path = files.pop(0)
+            st = os.stat(path)
+            key = (st.st_dev, st.st_ino)
+            os.remove(path)
+            removed += 1
+            inodes[key] -= 1
+            if not inodes[key]:
+                total -= sizes[key]
+    if removed:
+        print(f"Pruned {removed} archived snapshots")
+    if delta_writer and RETENTION_DAYS:
+        days = delta_writer.prune(time.time() - RETENTION_DAYS * 86400)
+        if days:
+            print(f"Pruned {days} days of delta archive")
+
 
 def copy_with_current_time():
+    """
+    Archive the live file if it changed since the last snapshot: identical
+    content (by sha256) becomes a hardlink, new content a gzip copy, and
+    with the delta archive on only the keys that changed are appended.
+    Returns False when there was nothing to archive.
+    """
+    global last_signature, unsettled
     if not os.path.exists(source_file):
         print(f"Source file not found: {source_file}")
-        return
+        return False
+
+    signature = file_signature()
+    if signature == last_signature:
+        return False
+    # Let a writer in progress finish before reading (unless it never pauses that long)
+    time.sleep(SETTLE_SEC)
+    if file_signature() != signature and unsettled < SETTLE_MAX_TRIES:
+        unsettled += 1
+        return False
+    unsettled = 0
+
+    with open(source_file, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if recent and next(reversed(recent)) == digest:
+        # Touched but not changed since the previous snapshot
+        last_signature = signature
+        return False
 
     # Use current time instead of creation time
-    formatted_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    now = datetime.now()
+    formatted_time = now.strftime(TIME_FORMAT)
+
+    if delta_writer:
+        kind = delta_writer.append(json.loads(data).get("data", {}), now.timestamp())
+        print(f"Archived {kind or 'unchanged data'} at {formatted_time}")
+
+    if ARCHIVE_FORMAT != "delta":
+        # Create new filename with current time
+        destination_base = os.path.join(destination_folder, f"{base_name}_{formatted_time}")
+        destination_file, how = store(data, digest, destination_base)
+        remember(digest, destination_file)
+        print(f"Created: {destination_file} ({how})")
+    else:
+        remember(digest, None)
+    # Only now: a failed store (e.g. disk full) is retried on the next poll
+    last_signature = signature
+    enforce_budget()
+    return True
+
 
-    # Create new filename with current time
-    base_name = "Mdc_Tele"
-    new_filename = f"{base_name}_{formatted_time}.json"
-    destination_file = os.path.join(destination_folder, new_filename)
+def load_recent():
+    """Seed the dedupe table from the newest archived snapshots so restarts do not duplicate."""
+    for _, path in archived_files()[-RECENT_CONTENTS:]:
+        try:
+            remember(hashlib.sha256(read_archive(path)).hexdigest(), path)
+        except (OSError, EOFError) as e:
+            print(f"Skipping unreadable snapshot {path}: {e}")
 
-    # Copy file
-    shutil.copy2(source_file, destination_file)
-    print(f"Created: {destination_file}")
 
 if __name__ == "__main__":
+    os.makedirs(destination_folder, exist_ok=True)
+    load_recent()
+    next_snapshot = 0.0
     while True:
-        copy_with_current_time()
-        time.sleep(60)  # wait 1 minute
\ No newline at end of file
+        # Wake on change (stat every POLL_SEC), but never snapshot more often than MIN_SNAPSHOT_INTERVAL_SEC
+        if time.time() >= next_snapshot:
+            try:
+                if copy_with_current_time():
+                    next_snapshot = time.time() + MIN_SNAPSHOT_INTERVAL_SEC
+            except (OSError, ValueError) as e:
+                print(f"Snapshot failed: {e}")
+        time.sleep(POLL_SEC)
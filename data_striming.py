@@ -1,10 +1,13 @@
 import asyncio
 import os
 import shutil
-import requests
-import socket
 from datetime import datetime
 from dotenv import load_dotenv
+from payload_watch import PayloadWatcher
+from http_transport import AsyncTransport
+import netcheck
+from spool import SpoolReader, SpoolWriter
+from segments import SEGMENT_PREFIX, SEGMENT_SUFFIX, encode, read_segment, write_atomic
 
 # ---------------------- LOAD ENV ----------------------
 load_dotenv()
@@ -12,8 +15,14 @@ load_dotenv()
 INTERNET_SOCKET_TIMEOUT = 2.0      # tolerate ~1–2 s RTT
 BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:5004")
 API_URL = f"{BASE_URL}/api/table/create"
+BATCH_API_URL = f"{BASE_URL}/api/table/create/batch"
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "500"))   # records per batch request
+RETRY_DELAY_SEC = 5                # back off before retrying failed files
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "4"))   # batches sent concurrently
 PAYLOAD_DIR = os.getenv("PAYLOAD_DIR", r"./payload")
 FAILED_DIR = os.getenv("FAILED_DIR", r"./payload_edit")
+HANDOFF_MODE = os.getenv("HANDOFF_MODE", "files")   # "files", "segments" or "spool" (see filewire.py)
+SPOOL_DIR = os.getenv("SPOOL_DIR", r"./spool")
 # ------------------------------------------------------
 
 
@@ -30,89 +39,239 @@ FAILED_DIR = os.getenv("FAILED_DIR", r"./payload_edit")
 #     return False
 
 def check_internet(timeout=INTERNET_SOCKET_TIMEOUT):
-    targets = [
-       ("1.1.1.1", 53),          # Cloudflare DNS (may be blocked in China)
-       ("114.114.114.114", 53),  # China DNS (China-friendly)
-       ("8.8.8.8", 53),          # Google DNS (may be blocked)
-       ("223.5.5.5", 53)         # Alibaba DNS (China-friendly)
-    ]
-    for host, port in targets:
+    """Shared, TTL-cached answer from netcheck (all DNS targets raced in parallel)."""
+    return netcheck.is_online(timeout=timeout)
+
+def build_payload(file, net_ok):
+    # Extract timestamp → CreatedOn
+    timestamp_str = file.split("_")[1].split(".")[0]
+    created_on = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S").isoformat()
+
+    # Decide status
+    transmission_status = "Processed" if net_ok else "Not Processed"
+    print(f"[{datetime.now().isoformat()}] File: {file} → {transmission_status}")
+
+    # Build payload
+    api_payload = {
+        "CreatedOn": created_on,
+        "FileName": file,
+        "TransmissionStatus": transmission_status,
+    }
+
+    if transmission_status == "Processed":
+        modified_on = datetime.now().replace(microsecond=0).isoformat()
+        api_payload["ModifiedOn"] = modified_on
+
+    return api_payload
+
+async def send_chunk(transport, watcher, chunk):
+    """Send one batch and act on each file from its own result; requeue what failed."""
+    retry = []
+    try:
+        net_ok = await asyncio.to_thread(check_internet)
+        payloads = [build_payload(file, net_ok) for file in chunk]
+
+        # Call API
         try:
-            with socket.create_connection((host, port), timeout=timeout):
-                return True
-        except OSError:
-            continue
+            status, body = await transport.post(BATCH_API_URL, {"records": payloads})
+
+            if status != 200:
+                print(f"⚠️ API error {status}: {body}")
+                retry = chunk
+            else:
+                for result in body["results"]:
+                    file = chunk[result["index"]]
+                    filepath = os.path.join(PAYLOAD_DIR, file)
+                    if not result["success"]:
+                        print(f"⚠️ API rejected {file}: {result.get('message')}")
+                        retry.append(file)
+                        continue
+
+                    print(f"📡 API updated for {file}")
+                    try:
+                        if payloads[result["index"]]["TransmissionStatus"] == "Processed":
+                            os.remove(filepath)
+                            print(f"🗑️ Deleted {file}")
+                        else:
+                            os.makedirs(FAILED_DIR, exist_ok=True)
+                            shutil.move(filepath, os.path.join(FAILED_DIR, file))
+                            print(f"📂 Moved {file} → {FAILED_DIR}")
+                    except FileNotFoundError:
+                        # Already gone (removed by hand or by another consumer): nothing left to do
+                        print(f"⚠️ {file} vanished before it could be cleaned up")
+                    except OSError as file_err:
+                        print(f"⚠️ Could not clean up {file}: {file_err}")
+                        retry.append(file)
+        except Exception as api_err:
+            print(f"❌ Failed API call for {len(chunk)} files ({chunk[0]} … {chunk[-1]}): {api_err}")
+            retry = chunk
+
+    except Exception as loop_err:
+        print(f"🔥 Error in main loop: {loop_err}")
+        retry = chunk
+
+    watcher.release([file for file in chunk if file not in retry])
+    if retry:
+        await asyncio.sleep(RETRY_DELAY_SEC)
+        watcher.requeue(retry)
 
-    return False
 
 async def process_files():
     """Continuously process NDCTELE JSON files in order of timestamp."""
-    while True:
+    watcher = PayloadWatcher(PAYLOAD_DIR)
+    await watcher.start()
+    transport = AsyncTransport(max_in_flight=MAX_IN_FLIGHT)
+    print(f"👀 Watching {PAYLOAD_DIR} ({watcher.mode}), {len(watcher)} files queued")
+
+    # Up to MAX_IN_FLIGHT batches on the wire; each file belongs to exactly one batch
+    slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+    in_flight = set()
+
+    async def run(chunk):
         try:
-            net_ok = check_internet()
+            await send_chunk(transport, watcher, chunk)
+        finally:
+            slots.release()
 
-            # Collect all files still present
-            files = [
-                f for f in os.listdir(PAYLOAD_DIR)
-                if f.startswith("NDCTELE_") and f.endswith(".json")
-            ]
+    try:
+        while True:
+            await slots.acquire()
+            # Oldest files first, BATCH_SIZE records per request (one transaction each)
+            chunk = await watcher.get_batch(BATCH_SIZE)
+            task = asyncio.create_task(run(chunk))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+    finally:
+        transport.close()
 
-            # Sort strictly by timestamp in filename
-            files.sort(key=lambda x: datetime.strptime(x.split("_")[1].split(".")[0], "%Y%m%d%H%M%S"))
 
-            for file in files:
-                filepath = os.path.join(PAYLOAD_DIR, file)
+async def process_spool():
+    """Spool mode: read the telemetry log in order, checkpointing after each delivered batch."""
+    reader = SpoolReader(os.path.join(SPOOL_DIR, "telemetry"), "create")
+    retry_log = SpoolWriter(os.path.join(SPOOL_DIR, "retry"))   # consumed by data_striming_edit
+    transport = AsyncTransport(max_in_flight=1)
+    print(f"📜 Reading {reader.directory} from offset {reader.committed} ({reader.lag} pending)")
 
-                # Extract timestamp → CreatedOn
-                timestamp_str = file.split("_")[1].split(".")[0]
-                created_on = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S").isoformat()
+    try:
+        while True:
+            batch = await reader.wait(BATCH_SIZE)
+            try:
+                net_ok = await asyncio.to_thread(check_internet)
+                payloads = [build_payload(record["FileName"], net_ok) for _offset, record in batch]
 
-                # Decide status
-                transmission_status = "Processed" if net_ok else "Not Processed"
-                print(f"[{datetime.now().isoformat()}] File: {file} → {transmission_status}")
+                status, body = await transport.post(BATCH_API_URL, {"records": payloads})
+                if status != 200:
+                    raise RuntimeError(f"API error {status}: {body}")
 
-                # Build payload
-                api_payload = {
-                    "CreatedOn": created_on,
-                    "FileName": file,
-                    "TransmissionStatus": transmission_status,
-                }
+                not_processed = []
+                for result in body["results"]:
+                    offset, record = batch[result["index"]]
+                    if not result["success"]:
+                        # Only malformed records are rejected; retrying cannot fix them
+                        print(f"⚠️ API rejected spool record {offset}: {result.get('message')}")
+                    elif payloads[result["index"]]["TransmissionStatus"] == "Not Processed":
+                        not_processed.append(record)
+                if not_processed:
+                    retry_log.append_many(not_processed)
 
-                if transmission_status == "Processed":
-                    modified_on = datetime.now().replace(microsecond=0).isoformat()
-                    api_payload["ModifiedOn"] = modified_on
+                reader.commit(batch[-1][0] + 1)
+                retry_log.prune()
+                print(f"📡 API updated for offsets {batch[0][0]}–{batch[-1][0]} ({len(not_processed)} queued for retry)")
+            except Exception as err:
+                print(f"❌ Failed to deliver offsets {batch[0][0]}–{batch[-1][0]}: {err}")
+                reader.rewind()
+                await asyncio.sleep(RETRY_DELAY_SEC)
+    finally:
+        transport.close()
+        retry_log.close()
+        reader.close()
 
-                # Call API
-                try:
-                    response = requests.post(API_URL, json=api_payload, timeout=10)
 
-                    if response.status_code in (200, 201):
-                        print(f"📡 API updated for {file}")
+def progress_path(name):
+    """Hidden sidecar holding how many records of a segment the API has accepted."""
+    return os.path.join(PAYLOAD_DIR, f".{name}.delivered")
 
-                        if transmission_status == "Processed":
-                            os.remove(filepath)
-                            print(f"🗑️ Deleted {file}")
-                        else:
-                            os.makedirs(FAILED_DIR, exist_ok=True)
-                            shutil.move(filepath, os.path.join(FAILED_DIR, file))
-                            print(f"📂 Moved {file} → {FAILED_DIR}")
-                    else:
-                        print(f"⚠️ API error {response.status_code}: {response.text}")
-                except Exception as api_err:
-                    print(f"❌ Failed API call for {file}: {api_err}")
 
-        except Exception as loop_err:
-            print(f"🔥 Error in main loop: {loop_err}")
+def read_progress(name):
+    try:
+        with open(progress_path(name)) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+async def process_segments():
+    """Segments mode: deliver NDCSEG segments oldest-first; a segment is deleted once every record is through."""
+    watcher = PayloadWatcher(PAYLOAD_DIR, prefix=SEGMENT_PREFIX, suffix=SEGMENT_SUFFIX)
+    await watcher.start()
+    transport = AsyncTransport(max_in_flight=1)
+    # Progress of segments that are gone (deleted by hand, or a crash between the two removes)
+    for entry in os.scandir(PAYLOAD_DIR):
+        if entry.name.startswith("." + SEGMENT_PREFIX) and entry.name.endswith(".delivered"):
+            if not os.path.exists(os.path.join(PAYLOAD_DIR, entry.name[1:-len(".delivered")])):
+                os.remove(entry.path)
+    print(f"👀 Watching {PAYLOAD_DIR} for segments ({watcher.mode}), {len(watcher)} queued")
+
+    try:
+        while True:
+            name = (await watcher.get_batch(1))[0]
+            path = os.path.join(PAYLOAD_DIR, name)
+            try:
+                records = read_segment(path)
+                # Records already accepted (persisted, so a retry or a restart resumes after them)
+                done = read_progress(name)
+                if done:
+                    print(f"⏩ Resuming {name} after {done} delivered records")
+                while done < len(records):
+                    chunk = records[done:done + BATCH_SIZE]
+                    net_ok = await asyncio.to_thread(check_internet)
+                    payloads = [build_payload(record["FileName"], net_ok) for record in chunk]
 
-        await asyncio.sleep(5)
+                    status, body = await transport.post(BATCH_API_URL, {"records": payloads})
+                    if status != 200:
+                        raise RuntimeError(f"API error {status}: {body}")
+
+                    for result in body["results"]:
+                        record = chunk[result["index"]]
+                        if not result["success"]:
+                            # Only malformed records are rejected; retrying cannot fix them
+                            print(f"⚠️ API rejected {record['FileName']} in {name}: {result.get('message')}")
+                        elif payloads[result["index"]]["TransmissionStatus"] == "Not Processed":
+                            # Same handoff as files mode: data_striming_edit picks these up
+                            os.makedirs(FAILED_DIR, exist_ok=True)
+                            write_atomic(os.path.join(FAILED_DIR, record["FileName"]), encode(record))
+                    done += len(chunk)
+                    write_atomic(progress_path(name), str(done).encode())
+
+                os.remove(path)
+                watcher.release([name])
+                try:
+                    os.remove(progress_path(name))
+                except FileNotFoundError:
+                    pass
+                print(f"🗑️ Delivered and deleted {name} ({len(records)} records)")
+            except Exception as err:
+                print(f"❌ Failed to deliver {name}: {err}")
+                await asyncio.sleep(RETRY_DELAY_SEC)
+                watcher.requeue([name])
+    finally:
+        transport.close()
+        watcher.close()
 
 
 if __name__ == "__main__":
     try:
         print(f"🔧 BASE_URL={BASE_URL}")
         print(f"🔧 API_URL={API_URL}")
+        print(f"🔧 BATCH_API_URL={BATCH_API_URL} (BATCH_SIZE={BATCH_SIZE})")
         print(f"📂 PAYLOAD_DIR={PAYLOAD_DIR}")
         print(f"📂 FAILED_DIR={FAILED_DIR}")
-        asyncio.run(process_files())
+        print(f"🔧 HANDOFF_MODE={HANDOFF_MODE}")
+        if HANDOFF_MODE == "spool":
+            asyncio.run(process_spool())
+        elif HANDOFF_MODE == "segments":
+            asyncio.run(process_segments())
+        else:
+            asyncio.run(process_files())
     except KeyboardInterrupt:
         print("🚪 Exiting gracefully...")
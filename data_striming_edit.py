@@ -1,9 +1,11 @@
 import asyncio
 import os
-import requests
-import socket
 from datetime import datetime
 from dotenv import load_dotenv
+from payload_watch import PayloadWatcher
+from http_transport import AsyncTransport
+import netcheck
+from spool import SpoolReader
 
 # ---------------------- LOAD ENV ----------------------
 load_dotenv()  # load variables from .env file if present
@@ -11,8 +13,13 @@ load_dotenv()  # load variables from .env file if present
 INTERNET_SOCKET_TIMEOUT = 2.0      # tolerate ~1–2 s RTT
 BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:5004")
 API_URL = f"{BASE_URL}/api/table/update"
+BATCH_API_URL = f"{BASE_URL}/api/table/update/batch"
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "500"))   # records per batch request
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "4"))   # batches sent concurrently
 # API_URL = os.getenv("API_URL", "http://127.0.0.1:5004/api/table/update")
 PAYLOAD_DIR = os.getenv("FAILED_DIR", r"./payload_edit")
+HANDOFF_MODE = os.getenv("HANDOFF_MODE", "files")   # "files", "segments" or "spool" (see filewire.py); segments retry as files
+SPOOL_DIR = os.getenv("SPOOL_DIR", r"./spool")
 # ------------------------------------------------------
 
 
@@ -31,78 +38,144 @@ PAYLOAD_DIR = os.getenv("FAILED_DIR", r"./payload_edit")
 #     return False
 
 def check_internet(timeout=INTERNET_SOCKET_TIMEOUT):
-    targets = [
-       ("1.1.1.1", 53),          # Cloudflare DNS (may be blocked in China)
-       ("114.114.114.114", 53),  # China DNS (China-friendly)
-       ("8.8.8.8", 53),          # Google DNS (may be blocked)
-       ("223.5.5.5", 53)         # Alibaba DNS (China-friendly)
-    ]
-    for host, port in targets:
+    """Shared, TTL-cached answer from netcheck (all DNS targets raced in parallel)."""
+    return netcheck.is_online(timeout=timeout)
+
+def build_payload(file):
+    # Extract timestamp → CreatedOn
+    timestamp_str = file.split("_")[1].split(".")[0]
+    created_on = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S").isoformat()
+    modified_on = datetime.now().replace(microsecond=0).isoformat()
+
+    return {
+        "CreatedOn": created_on,
+        "TransmissionStatus": "Processed",
+        "ModifiedOn": modified_on,
+    }
+
+async def send_chunk(transport, watcher, chunk):
+    """Send one batch of retries; delete files that were updated, requeue the rest."""
+    retry = []
+    try:
+        # Check internet only
+        if not await asyncio.to_thread(check_internet):
+            print(f"[{datetime.now().isoformat()}] ⚠️ Internet not ready → skipping API calls")
+            await asyncio.sleep(10)
+            watcher.requeue(chunk)
+            return
+
+        payloads = [build_payload(file) for file in chunk]
+
+        print(f"[{datetime.now().isoformat()}] Retrying {len(chunk)} files ({chunk[0]} … {chunk[-1]})")
+
+        # Call API
         try:
-            with socket.create_connection((host, port), timeout=timeout):
-                return True
-        except OSError:
-            continue
+            status, body = await transport.put(BATCH_API_URL, {"records": payloads})
+
+            if status != 200:
+                print(f"⚠️ API error {status}: {body}")
+                retry = chunk
+            else:
+                for result in body["results"]:
+                    file = chunk[result["index"]]
+                    if not result["success"]:
+                        print(f"⚠️ API rejected {file}: {result.get('message')}")
+                        retry.append(file)
+                        continue
+                    print(f"📡 API updated for {file}")
+                    try:
+                        os.remove(os.path.join(PAYLOAD_DIR, file))  # delete file after success
+                        print(f"🗑️ Deleted {file}")
+                    except FileNotFoundError:
+                        print(f"⚠️ {file} vanished before it could be deleted")
+                    except OSError as file_err:
+                        print(f"⚠️ Could not delete {file}: {file_err}")
+                        retry.append(file)
+        except Exception as api_err:
+            print(f"❌ Failed API call for {len(chunk)} files: {api_err}")
+            retry = chunk
+
+    except Exception as loop_err:
+        print(f"🔥 Error in main loop: {loop_err}")
+        retry = chunk
+
+    watcher.release([file for file in chunk if file not in retry])
+    if retry:
+        await asyncio.sleep(10)  # retry every 10 seconds
+        watcher.requeue(retry)
 
-    return False
 
 async def process_files():
     """Continuously retry NDCTELE JSON files in order of timestamp when network is up."""
-    while True:
+    watcher = PayloadWatcher(PAYLOAD_DIR)
+    await watcher.start()
+    transport = AsyncTransport(max_in_flight=MAX_IN_FLIGHT)
+    print(f"👀 Watching {PAYLOAD_DIR} ({watcher.mode}), {len(watcher)} files queued")
+
+    # Up to MAX_IN_FLIGHT batches on the wire; each file belongs to exactly one batch
+    slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+    in_flight = set()
+
+    async def run(chunk):
         try:
-            # Check internet only
-            if not check_internet():
-                print(f"[{datetime.now().isoformat()}] ⚠️ Internet not ready → skipping API calls")
-                await asyncio.sleep(10)
-                continue
-
-            # Collect all files still present
-            files = [
-                f for f in os.listdir(PAYLOAD_DIR)
-                if f.startswith("NDCTELE_") and f.endswith(".json")
-            ]
-
-            # Sort strictly by timestamp in filename
-            files.sort(key=lambda x: datetime.strptime(x.split("_")[1].split(".")[0], "%Y%m%d%H%M%S"))
-
-            for file in files:
-                filepath = os.path.join(PAYLOAD_DIR, file)
-
-                # Extract timestamp → CreatedOn
-                timestamp_str = file.split("_")[1].split(".")[0]
-                created_on = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S").isoformat()
-                modified_on = datetime.now().replace(microsecond=0).isoformat()
-
-                # Build payload
-                api_payload = {
-                    "CreatedOn": created_on,
-                    "TransmissionStatus": "Processed",
-                    "ModifiedOn": modified_on,
-                }
-
-                print(f"[{datetime.now().isoformat()}] Retrying {file} → {api_payload}")
-
-                # Call API
-                try:
-                    response = requests.put(API_URL, json=api_payload, timeout=10)
-
-                    if response.status_code in (200, 201):
-                        print(f"📡 API updated for {file}")
-                        os.remove(filepath)  # delete file after success
-                        print(f"🗑️ Deleted {file}")
-                    else:
-                        print(f"⚠️ API error {response.status_code}: {response.text}")
-                except Exception as api_err:
-                    print(f"❌ Failed API call for {file}: {api_err}")
+            await send_chunk(transport, watcher, chunk)
+        finally:
+            slots.release()
 
-        except Exception as loop_err:
-            print(f"🔥 Error in main loop: {loop_err}")
+    try:
+        while True:
+            await slots.acquire()
+            # Oldest files first, BATCH_SIZE records per request (one transaction each)
+            chunk = await watcher.get_batch(BATCH_SIZE)
+            task = asyncio.create_task(run(chunk))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+    finally:
+        transport.close()
+
+
+async def process_spool():
+    """Spool mode: retry the records data_striming logged as Not Processed, in order."""
+    reader = SpoolReader(os.path.join(SPOOL_DIR, "retry"), "update")
+    transport = AsyncTransport(max_in_flight=1)
+    print(f"📜 Reading {reader.directory} from offset {reader.committed} ({reader.lag} pending)")
 
-        await asyncio.sleep(10)  # retry every 10 seconds
+    try:
+        while True:
+            batch = await reader.wait(BATCH_SIZE)
+            try:
+                # Check internet only
+                if not await asyncio.to_thread(check_internet):
+                    print(f"[{datetime.now().isoformat()}] ⚠️ Internet not ready → skipping API calls")
+                    reader.rewind()
+                    await asyncio.sleep(10)
+                    continue
+
+                payloads = [build_payload(record["FileName"]) for _offset, record in batch]
+                print(f"[{datetime.now().isoformat()}] Retrying offsets {batch[0][0]}–{batch[-1][0]}")
+
+                status, body = await transport.put(BATCH_API_URL, {"records": payloads})
+                if status != 200:
+                    raise RuntimeError(f"API error {status}: {body}")
+
+                for result in body["results"]:
+                    if not result["success"]:
+                        # e.g. no row for CreatedOn: permanent, so log it rather than block the spool
+                        print(f"⚠️ API rejected spool record {batch[result['index']][0]}: {result.get('message')}")
+
+                reader.commit(batch[-1][0] + 1)
+                print(f"📡 API updated for offsets {batch[0][0]}–{batch[-1][0]}")
+            except Exception as err:
+                print(f"❌ Failed to deliver offsets {batch[0][0]}–{batch[-1][0]}: {err}")
+                reader.rewind()
+                await asyncio.sleep(10)  # retry every 10 seconds
+    finally:
+        transport.close()
+        reader.close()
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(process_files())
+        asyncio.run(process_spool() if HANDOFF_MODE == "spool" else process_files())
     except KeyboardInterrupt:
         print("🚪 Exiting gracefully...")
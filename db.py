@@ -1,6 +1,9 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
+from contextlib import contextmanager
+import base64
+import queue
 import sqlite3
  
 app = Flask(__name__)
@@ -8,11 +11,76 @@ CORS(app)
  
 DB_NAME = "mydatabase.db"
 TABLE_NAME = "telemetry"
+
+# ---- Connection tuning ----
+POOL_SIZE = 8                  # pooled connections (Flask serves each request on its own thread)
+CACHED_STATEMENTS = 64         # per-connection prepared statement cache
+BUSY_TIMEOUT_MS = 5000         # wait for the streamers' writes instead of failing
+
+# ---- Paging ----
+PAGE_DEFAULT_LIMIT = 100
+PAGE_MAX_LIMIT = 1000
+BATCH_MAX_RECORDS = 5000       # per /batch request, applied in one transaction
  
  
-# Function to initialize DB and create table if not exists
+def _connect():
+    conn = sqlite3.connect(
+        DB_NAME,
+        check_same_thread=False,
+        cached_statements=CACHED_STATEMENTS,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")   # WAL + NORMAL: no fsync per commit
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+
+@contextmanager
+def db_conn():
+    """Borrow a pooled connection; commits on success, rolls back on error."""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+# SQL is built once so every call hits the connection's statement cache
+INSERT_SQL = f"""
+    INSERT INTO {TABLE_NAME} (CreatedOn, ModifiedOn, FileName, TransmissionStatus)
+    VALUES (?, ?, ?, ?)
+"""
+LAST_10_SQL = f"""
+    SELECT ID, CreatedOn, ModifiedOn, FileName, TransmissionStatus
+    FROM (
+        SELECT ID, CreatedOn, ModifiedOn, FileName, TransmissionStatus
+        FROM {TABLE_NAME}
+        ORDER BY ID DESC
+        LIMIT 10
+    )
+    ORDER BY ID ASC
+"""
+UPDATE_SQL = f"""
+    UPDATE {TABLE_NAME}
+    SET TransmissionStatus = ?,
+        ModifiedOn = ?
+    WHERE CreatedOn = ?
+"""
+ 
+ 
+# Function to initialize DB and create table if not exists (once, at startup)
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
+    conn = _connect()
     cursor = conn.cursor()
     cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
@@ -23,13 +91,52 @@ def init_db():
             TransmissionStatus TEXT
         )
     """)
+    # (CreatedOn, ID) serves UPDATE ... WHERE CreatedOn = ? and keyset pages over time;
+    # the status index lets filtered pages walk only matching rows
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_created
+        ON {TABLE_NAME} (CreatedOn, ID)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_status_created
+        ON {TABLE_NAME} (TransmissionStatus, CreatedOn, ID)
+    """)
     conn.commit()
     conn.close()
+
+
+def row_to_dict(row):
+    return {
+        "ID": row[0],
+        "CreatedOn": row[1],
+        "ModifiedOn": row[2],
+        "FileName": row[3],
+        "TransmissionStatus": row[4]
+    }
+
+
+def encode_cursor(created_on, row_id):
+    return base64.urlsafe_b64encode(f"{created_on}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    created_on, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+    return created_on, int(row_id)
+
+
+def parse_timestamp(value):
+    """
+    Normalise a since/until value to the ISO form CreatedOn is stored in
+    (naive local time); a value with a UTC offset is converted to local first.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.replace(microsecond=0).isoformat()
  
  
 @app.route('/api/table/create', methods=['POST'])
 def create_and_insert():
-    init_db()  # make sure table exists
     data = request.json
  
     created_on = data.get("CreatedOn")
@@ -43,64 +150,76 @@ def create_and_insert():
     if not created_on or not file_name or not transmission_status:
         return jsonify({"success": False, "message": "CreatedOn, FileName,ModifiedOn, and TransmissionStatus are required"}), 400
  
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
- 
-    cursor.execute(f"""
-        INSERT INTO {TABLE_NAME} (CreatedOn, ModifiedOn, FileName, TransmissionStatus)
-        VALUES (?, ?, ?, ?)
-    """, (created_on,  modified_on, file_name, transmission_status))
- 
-    conn.commit()
-    conn.close()
+    with db_conn() as conn:
+        conn.execute(INSERT_SQL, (created_on,  modified_on, file_name, transmission_status))
  
     return jsonify({"success": True, "message": "Row inserted successfully"}), 201
  
  
 @app.route('/api/table/', methods=['GET'])
 def get_last_10():
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    # cursor.execute(f"""
-    #     SELECT ID, CreatedOn, ModifiedOn, FileName, TransmissionStatus
-    #     FROM {TABLE_NAME}
-    #     ORDER BY ID DESC
-    #     LIMIT 5
-    # """)
-    cursor.execute(f"""
-    SELECT ID, CreatedOn, ModifiedOn, FileName, TransmissionStatus
-    FROM (
-        SELECT ID, CreatedOn, ModifiedOn, FileName, TransmissionStatus
-        FROM {TABLE_NAME}
-        ORDER BY ID DESC
-        LIMIT 10
-    )
-    ORDER BY ID ASC
-    """)
-# rows = cursor.fetchall()
-
-    rows = cursor.fetchall()
-    conn.close()
+    with db_conn() as conn:
+        rows = conn.execute(LAST_10_SQL).fetchall()
  
     # Convert rows to dict list
-    data = [
-        {
-            "ID": row[0],
-            "CreatedOn": row[1],
-            "ModifiedOn": row[2],
-            "FileName": row[3],
-            "TransmissionStatus": row[4]
-        }
-        for row in rows
-    ]
+    data = [row_to_dict(row) for row in rows]
  
     return jsonify({"data": data}), 200
  
  
+@app.route('/api/table/page', methods=['GET'])
+def get_page():
+    """
+    Keyset-paginated history: ?since=&until=&status=&limit=&order=asc|desc&cursor=
+    Pages are ordered by (CreatedOn, ID); pass next_cursor back to continue.
+    """
+    args = request.args
+    order = args.get("order", "desc").lower()
+    if order not in ("asc", "desc"):
+        return jsonify({"success": False, "message": "order must be 'asc' or 'desc'"}), 400
+
+    try:
+        limit = min(max(int(args.get("limit", PAGE_DEFAULT_LIMIT)), 1), PAGE_MAX_LIMIT)
+        since = parse_timestamp(args["since"]) if args.get("since") else None
+        until = parse_timestamp(args["until"]) if args.get("until") else None
+        after = decode_cursor(args["cursor"]) if args.get("cursor") else None
+    except (ValueError, TypeError):
+        return jsonify({"success": False, "message": "Invalid limit, since, until or cursor"}), 400
+
+    where, params = [], []
+    if args.get("status"):
+        where.append("TransmissionStatus = ?")
+        params.append(args["status"])
+    if since:
+        where.append("CreatedOn >= ?")
+        params.append(since)
+    if until:
+        where.append("CreatedOn < ?")
+        params.append(until)
+    if after:
+        where.append(f"(CreatedOn, ID) {'<' if order == 'desc' else '>'} (?, ?)")
+        params.extend(after)
+
+    sql = f"""
+        SELECT ID, CreatedOn, ModifiedOn, FileName, TransmissionStatus
+        FROM {TABLE_NAME}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY CreatedOn {order}, ID {order}
+        LIMIT ?
+    """
+    with db_conn() as conn:
+        rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+    return jsonify({
+        "data": [row_to_dict(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+        "success": True
+    }), 200
+
+
 @app.route('/api/table/update', methods=['PUT'])
 def update_status():
-    init_db()
     data = request.json
  
     created_on = data.get("CreatedOn")
@@ -111,26 +230,103 @@ def update_status():
     if not created_on or not transmission_status or not modified_on:
         return jsonify({"success": False, "message": "CreatedOn, ModifiedOn, and TransmissionStatus are required"}), 400
  
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
- 
-    cursor.execute(f"""
-        UPDATE {TABLE_NAME}
-        SET TransmissionStatus = ?,
-            ModifiedOn = ?
-        WHERE CreatedOn = ?
-    """, (transmission_status, modified_on, created_on))
- 
-    conn.commit()
-    updated_rows = cursor.rowcount
-    conn.close()
+    with db_conn() as conn:
+        cursor = conn.execute(UPDATE_SQL, (transmission_status, modified_on, created_on))
+        updated_rows = cursor.rowcount
  
     if updated_rows == 0:
         return jsonify({"success": False, "message": "No record found with the given CreatedOn"}), 404
  
     return jsonify({"success": True, "message": "Status updated successfully"}), 200
- 
- 
+
+
+def unbindable_fields(data, names):
+    """Fields of a batch item SQLite cannot store (objects, lists, out-of-range integers)."""
+    bad = []
+    for name in names:
+        value = data.get(name)
+        if isinstance(value, int) and not -2**63 <= value < 2**63:
+            bad.append(name)
+        elif not isinstance(value, (str, int, float, type(None))):
+            bad.append(name)
+    return bad
+
+
+def batch_records():
+    """Records of a batch request: a JSON list, or {"records": [...]}."""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("records")
+    if not isinstance(data, list):
+        return None, (jsonify({"success": False, "message": "Body must be a list of records or {\"records\": [...]}"}), 400)
+    if len(data) > BATCH_MAX_RECORDS:
+        return None, (jsonify({"success": False, "message": f"At most {BATCH_MAX_RECORDS} records per batch"}), 413)
+    return data, None
+
+
+@app.route('/api/table/create/batch', methods=['POST'])
+def create_batch():
+    """Insert many rows in one transaction; per-item results in request order."""
+    records, error = batch_records()
+    if error:
+        return error
+
+    results = []
+    with db_conn() as conn:
+        for index, data in enumerate(records):
+            data = data if isinstance(data, dict) else {}
+            created_on = data.get("CreatedOn")
+            file_name = data.get("FileName")
+            transmission_status = data.get("TransmissionStatus")
+            if not created_on or not file_name or not transmission_status:
+                results.append({"index": index, "success": False, "message": "CreatedOn, FileName and TransmissionStatus are required"})
+                continue
+            bad = unbindable_fields(data, ("CreatedOn", "ModifiedOn", "FileName", "TransmissionStatus"))
+            if bad:
+                results.append({"index": index, "success": False, "message": f"{', '.join(bad)} must be a string or number"})
+                continue
+            cursor = conn.execute(INSERT_SQL, (created_on, data.get("ModifiedOn"), file_name, transmission_status))
+            results.append({"index": index, "success": True, "ID": cursor.lastrowid})
+
+    inserted = sum(1 for r in results if r["success"])
+    print(f"Batch create: {inserted}/{len(records)} rows inserted")
+    return jsonify({"success": inserted == len(records), "inserted": inserted, "results": results}), 200
+
+
+@app.route('/api/table/update/batch', methods=['PUT'])
+def update_batch():
+    """Apply many status updates in one transaction; per-item results in request order."""
+    records, error = batch_records()
+    if error:
+        return error
+
+    results = []
+    with db_conn() as conn:
+        for index, data in enumerate(records):
+            data = data if isinstance(data, dict) else {}
+            created_on = data.get("CreatedOn")
+            modified_on = data.get("ModifiedOn")
+            transmission_status = data.get("TransmissionStatus")
+            if not created_on or not transmission_status or not modified_on:
+                results.append({"index": index, "success": False, "message": "CreatedOn, ModifiedOn, and TransmissionStatus are required"})
+                continue
+            bad = unbindable_fields(data, ("CreatedOn", "ModifiedOn", "TransmissionStatus"))
+            if bad:
+                results.append({"index": index, "success": False, "message": f"{', '.join(bad)} must be a string or number"})
+                continue
+            cursor = conn.execute(UPDATE_SQL, (transmission_status, modified_on, created_on))
+            if cursor.rowcount == 0:
+                results.append({"index": index, "success": False, "message": "No record found with the given CreatedOn"})
+            else:
+                results.append({"index": index, "success": True, "updated": cursor.rowcount})
+
+    updated = sum(1 for r in results if r["success"])
+    return jsonify({"success": updated == len(records), "updated": updated, "results": results}), 200
+
+
+init_db()
+
+
 if __name__ == '__main__':
     app.run(host='172.168.0.81', port=5004, debug=True)
     # app.run(host='192.168.18.143', port=5004, debug=True)
\ No newline at end of file
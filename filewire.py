@@ -1,15 +1,33 @@
 import os
-import json
 import time
 from datetime import datetime
+from spool import SpoolWriter
+from segments import SegmentWriter, encode, write_atomic
 
 # Output directory
-output_dir = r"C:\vessel-604\release-vessel-604-backend\payload"
+output_dir = os.getenv("PAYLOAD_DIR", r"C:\vessel-604\release-vessel-604-backend\payload")
 # output_dir = r"D:\development\React\for vessel\backend\payload"
 
+# "files":    one NDCTELE_*.json per record in output_dir (written atomically)
+# "segments": records batched into rotating NDCSEG_*.ndjson segments in output_dir (see segments.py)
+# "spool":    append to the telemetry spool read by the streamers (see spool.py)
+HANDOFF_MODE = os.getenv("HANDOFF_MODE", "files")
+SPOOL_DIR = os.getenv("SPOOL_DIR", r"./spool")
+FSYNC_EVERY = int(os.getenv("FILEWIRE_FSYNC_EVERY", "1"))                 # records per fsync (0 = OS decides)
+# One record a minute: a segment fills with SEGMENT_MAX_RECORDS records in that many minutes, so the
+# age limit matches it; lower both (e.g. 10 / 600) to get records to the API sooner in smaller batches
+SEGMENT_MAX_RECORDS = int(os.getenv("FILEWIRE_SEGMENT_RECORDS", "60"))     # records per segment
+SEGMENT_MAX_AGE_SEC = float(os.getenv("FILEWIRE_SEGMENT_AGE_SEC", "3600")) # publish a segment at least this often
+
 # Make sure directory exists
 os.makedirs(output_dir, exist_ok=True)
 
+spool_writer = SpoolWriter(os.path.join(SPOOL_DIR, "telemetry")) if HANDOFF_MODE == "spool" else None
+segment_writer = SegmentWriter(
+    output_dir, max_records=SEGMENT_MAX_RECORDS, max_age_sec=SEGMENT_MAX_AGE_SEC, fsync_every=FSYNC_EVERY
+) if HANDOFF_MODE == "segments" else None
+written = 0
+
 while True:
     # Generate timestamp
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -24,10 +42,20 @@ while True:
         "port": 562,
     }
 
-    # Write JSON to file
-    with open(filepath, "w") as f:
-        json.dump(data, f, indent=4)
+    if spool_writer:
+        offset = spool_writer.append({**data, "FileName": filename})
+        spool_writer.prune()
+        print(f"Spooled: {filename} @ {offset}")
+    elif segment_writer:
+        segment_writer.append({**data, "FileName": filename}, timestamp)
+        print(f"Segmented: {filename}")
+    else:
+        # Temp file + rename: the streamer never sees a half-written file
+        written += 1
+        write_atomic(filepath, encode(data), fsync=bool(FSYNC_EVERY) and written % FSYNC_EVERY == 0)
 
-    print(f"Generated: {filepath}")
+        print(f"Generated: {filepath}")
 
     time.sleep(60)  # wait 1 minute
+    if segment_writer:
+        segment_writer.maybe_rotate()
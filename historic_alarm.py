@@ -1,37 +1,112 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-from datetime import datetime
-import subprocess, socket, threading, time, sqlite3
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import math, os, threading, time, sqlite3, queue
+import monitor
+from monitor import now_str
 
 app = Flask(__name__)
 CORS(app)
 
-# ========= Tunables =========
-PING_COUNT = 2
-PING_TIMEOUT_MS = 600
-SUBPROC_HARD_TIMEOUT = 2.5
-
-RAISE_AFTER_FAILS = 3
-CLEAR_AFTER_SUCCESSES = 2
-MIN_HOLD_SECONDS = 15
-
-SWEEP_PERIOD_SEC = 1.0
-INTERNET_CHECK_PERIOD_SEC = 5.0
-INTERNET_SOCKET_TIMEOUT = 2.0
-
-HOSTS = [
-    {"name": "MDC", "ip": "172.168.0.80"},
-    {"name": "PRAXIS", "ip": "192.168.1.101"},
-]
+# Probing, hysteresis and tunables live in monitor.py (shared with Api_Alert
+# and Ping_satatus); this service only records raise/clear transitions.
 
 # ========= DB Setup =========
 DB_NAME = "mydatabase.db"
 TABLE_NAME = "historical"
+HOURLY_TABLE = "historical_hourly"
+DAILY_TABLE = "historical_daily"
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
+WRITER_FLUSH_SEC = 0.5             # max delay before a batch is committed
+WRITER_MAX_BATCH = 500             # events per transaction
+
+# ---- Retention (0 = keep forever) ----
+RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS", "90"))          # raw events
+HOURLY_RETENTION_DAYS = float(os.getenv("HISTORY_HOURLY_RETENTION_DAYS", "400"))
+PRUNE_PERIOD_SEC = 3600.0
+PRUNE_CHUNK = 5000                 # rows deleted per transaction
+# Pruning only returns pages to the OS once the shared mydatabase.db is in
+# incremental auto-vacuum mode. Switching needs one full VACUUM (an exclusive
+# rewrite of the whole file, telemetry included), so it is opt-in: set this for
+# one start during a maintenance window.
+ENABLE_AUTO_VACUUM = os.getenv("HISTORY_ENABLE_AUTO_VACUUM", "0") == "1"
+
+# Columns added when alarms became raise/clear events (Time is the raise time)
+EVENT_COLUMNS = {
+    "EndTime": "TEXT",
+    "StartEpoch": "REAL",
+    "EndEpoch": "REAL",
+    "DurationSec": "REAL",
+}
+
+# ========= Rollups =========
+# One row per (bucket start epoch, label), in local hours / local days:
+#   Raised      alarms raised in the bucket
+#   DowntimeSec time alarms were active inside the bucket (counted when they clear)
+#   Cleared     alarms cleared in the bucket
+#   RepairSec   total duration of the alarms cleared in the bucket (MTTR = RepairSec / Cleared)
+def hour_start(t):
+    return datetime.fromtimestamp(t).replace(minute=0, second=0, microsecond=0).timestamp()
+
+def day_start(t):
+    return datetime.fromtimestamp(t).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+ROLLUPS = (
+    (HOURLY_TABLE, hour_start, timedelta(hours=1)),
+    (DAILY_TABLE, day_start, timedelta(days=1)),
+)
+
+def add_rollup(cursor, table, bucket, label, raised=0, downtime=0.0, cleared=0, repair=0.0):
+    cursor.execute(f"""
+        INSERT INTO {table} (Bucket, Label, Raised, DowntimeSec, Cleared, RepairSec)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (Bucket, Label) DO UPDATE SET
+            Raised = Raised + excluded.Raised,
+            DowntimeSec = DowntimeSec + excluded.DowntimeSec,
+            Cleared = Cleared + excluded.Cleared,
+            RepairSec = RepairSec + excluded.RepairSec
+    """, (bucket, label, raised, downtime, cleared, repair))
+
+def rollup_raise(cursor, label, start):
+    for table, bucket_of, _ in ROLLUPS:
+        add_rollup(cursor, table, bucket_of(start), label, raised=1)
+
+def rollup_clear(cursor, label, start, end):
+    """Spread [start, end) over the buckets it covers and count the repair where it ended."""
+    for table, bucket_of, step in ROLLUPS:
+        t = start
+        while t < end:
+            bucket = bucket_of(t)
+            next_bucket = (datetime.fromtimestamp(bucket) + step).timestamp()
+            add_rollup(cursor, table, bucket, label, downtime=min(end, next_bucket) - t)
+            t = next_bucket
+        add_rollup(cursor, table, bucket_of(end), label, cleared=1, repair=max(0.0, end - start))
+
+def close_event(cursor, row_id, label, start, ts):
+    cursor.execute(f"""
+        UPDATE {TABLE_NAME}
+        SET EndTime = ?, EndEpoch = ?, DurationSec = MAX(0, ? - StartEpoch)
+        WHERE ID = ?
+    """, (now_str(ts), ts.timestamp(), ts.timestamp(), row_id))
+    rollup_clear(cursor, label, start, max(start, ts.timestamp()))
+
+def enable_incremental_vacuum(conn):
+    """Switch the database to auto_vacuum=INCREMENTAL (one full VACUUM; see ENABLE_AUTO_VACUUM)."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+    try:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        print(f"{DB_NAME} now uses incremental vacuum")
+    except sqlite3.OperationalError as e:
+        print(f"Could not enable incremental vacuum ({e}); will retry on next start")
+
+def init_db(conn=None):
+    own = conn is None
+    conn = conn or sqlite3.connect(DB_NAME)
+    if ENABLE_AUTO_VACUUM:
+        enable_incremental_vacuum(conn)
     cursor = conn.cursor()
     cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
@@ -40,160 +115,309 @@ def init_db():
             Time TEXT
         )
     """)
-    conn.commit()
-    conn.close()
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({TABLE_NAME})")}
+    for col, col_type in EVENT_COLUMNS.items():
+        if col not in existing:
+            cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN {col} {col_type}")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_start ON {TABLE_NAME} (StartEpoch)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_end ON {TABLE_NAME} (EndEpoch)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_label_end ON {TABLE_NAME} (Label, EndEpoch)")
 
-def insert_alarm(label, time):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(f"INSERT INTO {TABLE_NAME} (Label, Time) VALUES (?, ?)", (label, time))
+    # Rows from before raise/clear events only have the "%H:%M:%S %d-%m-%Y" Time;
+    # give them epochs (as closed, zero-length rows) so retention can age them out
+    cursor.execute(f"""
+        UPDATE {TABLE_NAME}
+        SET StartEpoch = CAST(strftime('%s', substr(Time, 16, 4) || '-' || substr(Time, 13, 2) || '-'
+                                              || substr(Time, 10, 2) || ' ' || substr(Time, 1, 8), 'utc') AS REAL),
+            EndTime = Time
+        WHERE StartEpoch IS NULL AND EndTime IS NULL
+    """)
+    cursor.execute(f"UPDATE {TABLE_NAME} SET EndEpoch = StartEpoch WHERE EndEpoch IS NULL AND EndTime IS NOT NULL")
+
+    tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table, _, _ in ROLLUPS:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                Bucket REAL NOT NULL,
+                Label TEXT NOT NULL,
+                Raised INTEGER NOT NULL DEFAULT 0,
+                DowntimeSec REAL NOT NULL DEFAULT 0,
+                Cleared INTEGER NOT NULL DEFAULT 0,
+                RepairSec REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (Bucket, Label)
+            )
+        """)
+    rebuild = not all(table in tables for table, _, _ in ROLLUPS)
+
+    # Alarms left open by a previous run can no longer be cleared; close them now
+    now = datetime.now()
+    open_rows = cursor.execute(f"""
+        SELECT ID, Label, StartEpoch FROM {TABLE_NAME}
+        WHERE StartEpoch IS NOT NULL AND EndEpoch IS NULL
+    """).fetchall()
+    for row_id, label, start in open_rows:
+        close_event(cursor, row_id, label, start, now)
+
+    if rebuild:
+        # First run with rollups: derive them once from the events already recorded
+        for table, _, _ in ROLLUPS:
+            cursor.execute(f"DELETE FROM {table}")
+        rows = cursor.execute(f"""
+            SELECT Label, StartEpoch, EndEpoch FROM {TABLE_NAME}
+            WHERE DurationSec IS NOT NULL
+        """).fetchall()
+        for label, start, end in rows:
+            rollup_raise(cursor, label, start)
+            rollup_clear(cursor, label, start, end)
     conn.commit()
-    conn.close()
+    if own:
+        conn.close()
 
-# ========= State =========
-state_lock = threading.Lock()
-host_state = {
-    h["ip"]: {
-        "name": h["name"],
-        "consec_fails": 0,
-        "consec_oks": 0,
-        "alert_active": False,
-        "last_change": None,
-        "last_ping_ok": None,
-        "last_result_ts": None,
-    } for h in HOSTS
-}
-internet_state = {"ok": True, "last_checked": None}
-alerts_cache = []
-alerts_cache_ts = 0.0
-
-# ========= Helpers =========
-def now_str(dt=None):
-    return (dt or datetime.now()).strftime("%H:%M:%S %d-%m-%Y")
-
-def check_internet_fast(timeout=INTERNET_SOCKET_TIMEOUT):
-    targets = [
-       ("1.1.1.1", 53),
-       ("114.114.114.114", 53),
-       ("8.8.8.8", 53),
-       ("223.5.5.5", 53)
-    ]
-    for host, port in targets:
-        try:
-            with socket.create_connection((host, port), timeout=timeout):
-                return True
-        except OSError:
-            continue
-    return False
-
-def ping_ok(ip):
-    cmd = ["ping", "-n", str(PING_COUNT), "-w", str(PING_TIMEOUT_MS), ip]
-    try:
-        res = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=SUBPROC_HARD_TIMEOUT
-        )
-        out = res.stdout + res.stderr
-        replies = sum(1 for line in out.splitlines() if "Reply from" in line)
-        return replies >= (PING_COUNT // 2 + 1)
-    except Exception:
-        return False
-
-def apply_hysteresis(ip, is_up, ts):
-    s = host_state[ip]
-    s["last_result_ts"] = ts
-    if is_up:
-        s["consec_oks"] += 1
-        s["consec_fails"] = 0
-        s["last_ping_ok"] = True
-        if s["alert_active"]:
-            held_long_enough = (
-                s["last_change"] is None
-                or (ts - s["last_change"]).total_seconds() >= MIN_HOLD_SECONDS
+def prune(conn, now=None):
+    """Drop raw events and hourly rollups past retention, then hand the free pages back."""
+    now = now or time.time()
+    removed = 0
+    if RETENTION_DAYS:
+        cutoff = now - RETENTION_DAYS * 86400
+        while True:
+            with conn:
+                deleted = conn.execute(f"""
+                    DELETE FROM {TABLE_NAME} WHERE ID IN (
+                        SELECT ID FROM {TABLE_NAME} WHERE EndEpoch < ? LIMIT ?
+                    )
+                """, (cutoff, PRUNE_CHUNK)).rowcount
+            removed += deleted
+            if deleted < PRUNE_CHUNK:
+                break
+    if HOURLY_RETENTION_DAYS:
+        with conn:
+            conn.execute(f"DELETE FROM {HOURLY_TABLE} WHERE Bucket < ?", (now - HOURLY_RETENTION_DAYS * 86400,))
+    conn.execute("PRAGMA incremental_vacuum")
+    return removed
+
+class AlarmWriter(threading.Thread):
+    """
+    Single writer for the historical table and its rollups. Raise/clear
+    events are queued by the monitor and committed in batches on one
+    persistent WAL connection; retention pruning runs on the same thread.
+    """
+
+    def __init__(self, db_name=DB_NAME):
+        super().__init__(name="alarm-writer", daemon=True)
+        self.db_name = db_name
+        self.events = queue.Queue()
+        self.next_prune = time.monotonic()
+
+    def raise_alarm(self, label, ts):
+        self.events.put(("raise", label, ts))
+
+    def clear_alarm(self, label, ts):
+        self.events.put(("clear", label, ts))
+
+    def _apply(self, cursor, kind, label, ts):
+        if kind == "raise":
+            cursor.execute(
+                f"INSERT INTO {TABLE_NAME} (Label, Time, StartEpoch) VALUES (?, ?, ?)",
+                (label, now_str(ts), ts.timestamp()),
             )
-            if s["consec_oks"] >= CLEAR_AFTER_SUCCESSES and held_long_enough:
-                s["alert_active"] = False
-                s["last_change"] = ts
-    else:
-        s["consec_fails"] += 1
-        s["consec_oks"] = 0
-        s["last_ping_ok"] = False
-        if not s["alert_active"] and s["consec_fails"] >= RAISE_AFTER_FAILS:
-            s["alert_active"] = True
-            s["last_change"] = ts
-
-def recompute_alerts(ts):
-    alerts = []
-    if not internet_state["ok"]:
-        label = "No internet connection available"
-        time_str = now_str(ts)
-        alerts.append({"label": label, "time": time_str})
-        insert_alarm(label, time_str)
-
-    for ip, s in host_state.items():
-        if s["alert_active"]:
-            label = f"{s['name']} Disconnected."
-            time_str = now_str(ts)
-            alerts.append({"label": label, "time": time_str})
-            insert_alarm(label, time_str)
-
-    return alerts
-
-# ========= Background Monitor =========
-def monitor_loop(stop_event: threading.Event):
-    last_net_check = 0.0
-    with ThreadPoolExecutor(max_workers=max(4, len(HOSTS))) as pool:
-        while not stop_event.is_set():
-            ts = datetime.now()
-
-            if (time.time() - last_net_check) >= INTERNET_CHECK_PERIOD_SEC:
-                ok = check_internet_fast()
-                with state_lock:
-                    internet_state["ok"] = ok
-                    internet_state["last_checked"] = ts
-                last_net_check = time.time()
-
-            futures = {pool.submit(ping_ok, h["ip"]): h["ip"] for h in HOSTS}
-            results = {}
-            for fut in as_completed(futures):
-                ip = futures[fut]
+            rollup_raise(cursor, label, ts.timestamp())
+        else:
+            rows = cursor.execute(
+                f"SELECT ID, StartEpoch FROM {TABLE_NAME} WHERE Label = ? AND EndEpoch IS NULL AND StartEpoch IS NOT NULL",
+                (label,),
+            ).fetchall()
+            for row_id, start in rows:
+                close_event(cursor, row_id, label, start, ts)
+
+    def run(self):
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            try:
+                batch = [self.events.get(timeout=max(0.1, self.next_prune - time.monotonic()))]
+            except queue.Empty:
+                batch = []
+            deadline = time.monotonic() + WRITER_FLUSH_SEC
+            while batch and len(batch) < WRITER_MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.events.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        cursor = conn.cursor()
+                        for kind, label, ts in batch:
+                            self._apply(cursor, kind, label, ts)
+                except sqlite3.Error as e:
+                    print(f"Alarm writer failed to commit {len(batch)} events: {e}")
+            if time.monotonic() >= self.next_prune:
+                self.next_prune = time.monotonic() + PRUNE_PERIOD_SEC
                 try:
-                    results[ip] = fut.result()
-                except Exception:
-                    results[ip] = False
+                    removed = prune(conn)
+                    if removed:
+                        print(f"Pruned {removed} alarm events older than {RETENTION_DAYS:g} days")
+                except sqlite3.Error as e:
+                    print(f"Alarm history pruning failed: {e}")
 
-            with state_lock:
-                for ip, is_up in results.items():
-                    apply_hysteresis(ip, is_up, ts)
-                global alerts_cache, alerts_cache_ts
-                alerts_cache = recompute_alerts(ts)
-                alerts_cache_ts = time.time()
+# ========= Alarm events =========
+def on_sweep(event):
+    # Persist transitions only: one row per alarm, closed when it clears
+    for label in event["raised"]:
+        alarm_writer.raise_alarm(label, event["ts"])
+    for label in event["cleared"]:
+        alarm_writer.clear_alarm(label, event["ts"])
 
-            stop_event.wait(SWEEP_PERIOD_SEC)
+init_db()
+alarm_writer = AlarmWriter()
+alarm_writer.start()
 
-stop_flag = threading.Event()
-threading.Thread(target=monitor_loop, args=(stop_flag,), daemon=True).start()
+monitor.subscribe(on_sweep)
+monitor.start()
 
 # ========= API =========
+HISTORY_DEFAULT_LIMIT = 20
+HISTORY_MAX_LIMIT = 1000
+HOURLY_MAX_RANGE_SEC = 2 * 86400   # longer summaries read daily rollups
+
+def parse_time(value):
+    """Epoch seconds or an ISO date/datetime (local time) -> epoch seconds; ValueError if unusable."""
+    try:
+        ts = float(value)
+    except ValueError:
+        ts = datetime.fromisoformat(value).timestamp()
+    if not math.isfinite(ts):
+        raise ValueError(f"{value} is not a finite time")
+    try:
+        # Rollup buckets are local datetimes, so the time must have one
+        datetime.fromtimestamp(ts)
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"{value} is out of range") from e
+    return ts
+
+def summarize(cursor, start, end, label, granularity):
+    """Per-label counts, downtime and MTTR over [start, end) from the rollups plus still-open alarms."""
+    table, bucket_of, _ = next(r for r in ROLLUPS if r[0] == (HOURLY_TABLE if granularity == "hour" else DAILY_TABLE))
+    query = f"""
+        SELECT Bucket, Label, Raised, DowntimeSec, Cleared, RepairSec FROM {table}
+        WHERE Bucket >= ? AND Bucket < ?
+    """
+    params = [bucket_of(start), end]
+    if label:
+        query += " AND Label = ?"
+        params.append(label)
+    rows = cursor.execute(query + " ORDER BY Bucket", params).fetchall()
+
+    totals = {}
+    for _, lbl, raised, downtime, cleared, repair in rows:
+        t = totals.setdefault(lbl, {"raised": 0, "downtime_sec": 0.0, "cleared": 0, "repair_sec": 0.0})
+        t["raised"] += raised
+        t["downtime_sec"] += downtime
+        t["cleared"] += cleared
+        t["repair_sec"] += repair
+
+    # Active alarms are only rolled up when they clear; add their time so far
+    query = f"SELECT Label, StartEpoch FROM {TABLE_NAME} WHERE EndEpoch IS NULL AND StartEpoch < ?"
+    params = [end]
+    if label:
+        query += " AND Label = ?"
+        params.append(label)
+    now = time.time()
+    for lbl, started in cursor.execute(query, params):
+        overlap = min(end, now) - max(start, started)
+        if overlap > 0:
+            t = totals.setdefault(lbl, {"raised": 0, "downtime_sec": 0.0, "cleared": 0, "repair_sec": 0.0})
+            t["downtime_sec"] += overlap
+
+    span = max(1.0, min(end, now) - start)
+    summary = [
+        {
+            "label": lbl,
+            "raised": t["raised"],
+            "cleared": t["cleared"],
+            "downtime_sec": round(t["downtime_sec"], 1),
+            "mttr_sec": round(t["repair_sec"] / t["cleared"], 1) if t["cleared"] else None,
+            "availability": round(max(0.0, 1 - t["downtime_sec"] / span), 6),
+        }
+        for lbl, t in sorted(totals.items())
+    ]
+    series = [
+        {
+            "bucket": now_str(datetime.fromtimestamp(bucket)),
+            "label": lbl,
+            "raised": raised,
+            "downtime_sec": round(downtime, 1),
+            "cleared": cleared,
+            "mttr_sec": round(repair / cleared, 1) if cleared else None,
+        }
+        for bucket, lbl, raised, downtime, cleared, repair in rows
+    ]
+    return summary, series
 
 @app.route('/historical', methods=['GET'])
 def get_historical():
-    init_db()
+    """
+    Latest alarm events (newest first). Optional filters:
+      from, to   epoch seconds or ISO datetime; events overlapping the range,
+                 plus a per-label "summary" from the rollup tables
+      label      one alarm label
+      bucket     "hour" or "day": also return the rollup rows as "series"
+      limit      events to return (default 20, max 1000)
+    """
+    try:
+        start = parse_time(request.args["from"]) if "from" in request.args else None
+        end = parse_time(request.args["to"]) if "to" in request.args else time.time()
+        limit = min(int(request.args.get("limit", HISTORY_DEFAULT_LIMIT)), HISTORY_MAX_LIMIT)
+    except (ValueError, OverflowError, OSError):
+        return jsonify({"success": False, "message": "Invalid from, to or limit"}), 400
+    label = request.args.get("label")
+    bucket = request.args.get("bucket")
+    if bucket not in (None, "hour", "day"):
+        return jsonify({"success": False, "message": "bucket must be 'hour' or 'day'"}), 400
+
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
     # cursor.execute(f"SELECT Label, Time FROM {TABLE_NAME} ORDER BY ID ASC")
-    cursor.execute(f"SELECT Label, Time FROM {TABLE_NAME} ORDER BY ID DESC LIMIT 20")
-
+    query = f"SELECT Label, Time, EndTime, DurationSec, StartEpoch FROM {TABLE_NAME} WHERE 1 = 1"
+    params = []
+    if start is not None:
+        query += " AND (EndEpoch IS NULL OR EndEpoch >= ?) AND StartEpoch < ?"
+        params += [start, end]
+    elif "to" in request.args:
+        query += " AND StartEpoch < ?"
+        params.append(end)
+    if label:
+        query += " AND Label = ?"
+        params.append(label)
+    cursor.execute(query + " ORDER BY ID DESC LIMIT ?", params + [max(0, limit)])
     rows = cursor.fetchall()
+
+    payload = {"success": True}
+    if start is not None:
+        granularity = bucket or ("hour" if end - start <= HOURLY_MAX_RANGE_SEC else "day")
+        summary, series = summarize(cursor, start, end, label, granularity)
+        payload["granularity"] = granularity
+        payload["summary"] = summary
+        if bucket:
+            payload["series"] = series
     conn.close()
 
-    alerts = [{"label": row[0], "time": row[1]} for row in rows]
-    return jsonify({"alerts": alerts, "success": True}), 200
+    payload["alerts"] = [
+        {
+            "label": row[0],
+            "time": row[1],
+            "end_time": row[2],
+            "duration_sec": round(row[3], 1) if row[3] is not None else None,
+            "active": row[4] is not None and row[2] is None,
+        }
+        for row in rows
+    ]
+    return jsonify(payload), 200
 
 if __name__ == '__main__':
-    init_db()
     # app.run(host='192.168.18.143', port=5007, debug=True, threaded=True, use_reloader=False)
     app.run(host='172.168.0.81', port=5007, debug=True, threaded=True, use_reloader=False)
@@ -0,0 +1,64 @@
+"""
+Non-blocking HTTP transport for the data streamers.
+
+Requests go through one keep-alive ``requests.Session`` whose calls run on a
+small dedicated thread pool, so the asyncio loop never blocks on the network.
+A semaphore caps the number of requests in flight and every call carries both
+a socket timeout and an overall deadline enforced on the loop.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_IN_FLIGHT = 4                  # concurrent requests per transport
+REQUEST_TIMEOUT_SEC = 30.0         # connect/read timeout handed to requests
+DEADLINE_GRACE_SEC = 5.0           # extra slack before the loop gives up on a call
+
+
+class TransportError(Exception):
+    pass
+
+
+class AsyncTransport:
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, timeout=REQUEST_TIMEOUT_SEC):
+        self.timeout = timeout
+        self._sem = asyncio.Semaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="http")
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _send(self, method, url, payload, timeout):
+        response = self._session.request(method, url, json=payload, timeout=timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        return response.status_code, body
+
+    async def request(self, method, url, payload=None, timeout=None):
+        """Returns (status_code, parsed JSON or text). Raises TransportError on network failure."""
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        async with self._sem:
+            call = loop.run_in_executor(self._executor, partial(self._send, method, url, payload, timeout))
+            try:
+                return await asyncio.wait_for(call, timeout + DEADLINE_GRACE_SEC)
+            except asyncio.TimeoutError:
+                raise TransportError(f"{method} {url} exceeded {timeout + DEADLINE_GRACE_SEC:.0f}s")
+            except requests.RequestException as e:
+                raise TransportError(str(e)) from e
+
+    async def post(self, url, payload, timeout=None):
+        return await self.request("POST", url, payload, timeout)
+
+    async def put(self, url, payload, timeout=None):
+        return await self.request("PUT", url, payload, timeout)
+
+    def close(self):
+        self._session.close()
+        self._executor.shutdown(wait=False)
@@ -1,5 +1,34 @@
 # main.py
+"""
+Supervisor for the backend services.
+
+    python main.py            one child process per service (supervised)
+    python main.py --single   every service in this interpreter
+
+Supervised mode starts the services one by one, waiting for each Flask port to
+accept connections before moving on, restarts children that exit or stop
+answering (exponential backoff), and serves per-child CPU/RSS on
+http://<BIND_HOST>:<SUPERVISOR_PORT>/supervisor/status.
+
+Single-process mode imports every module once and serves each Flask app on
+its usual port from a thread, so clients see the same URLs while only one
+interpreter (and one copy of Flask) is resident.
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import signal
+import socket
 import subprocess
+import sys
+import threading
+import time
+
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+HERE = os.path.dirname(os.path.abspath(__file__))
 
 files_to_run = [
     "Api_Alert.py",
@@ -12,7 +41,283 @@ files_to_run = [
     "Ping_satatus.py",
 ]
 
-# Run each file one by one
-for file in files_to_run:
-    print(f"🚀 Running {file} ...")
-    subprocess.Popen(["python", file])
+# Flask port of each service (None = background worker, no readiness probe)
+SERVICE_PORTS = {
+    "Api_Alert.py": 5001,
+    "Band_storage.py": 5003,
+    "db.py": 5004,
+    "mqtt.py": 5005,
+    "Ping_satatus.py": 5006,
+    "historic_alarm.py": 5007,
+}
+
+# ---- Tunables ----
+BIND_HOST = os.getenv("BIND_HOST", "172.168.0.81")
+SUPERVISOR_PORT = int(os.getenv("SUPERVISOR_PORT", "5010"))
+STAGGER_SEC = 1.0                  # pause between service starts
+READY_TIMEOUT_SEC = 30.0           # give up waiting for a port after this long
+HEALTH_INTERVAL_SEC = 5.0          # liveness probe period for Flask ports
+HEALTH_FAILS_TO_RESTART = 3        # consecutive failed probes before a restart
+BACKOFF_INITIAL_SEC = 1.0
+BACKOFF_MAX_SEC = 60.0
+STABLE_AFTER_SEC = 60.0            # a child that ran this long gets its backoff reset
+STOP_GRACE_SEC = 10.0
+
+
+def port_open(port, timeout=1.0):
+    try:
+        with socket.create_connection((BIND_HOST, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def process_usage(pid):
+    """(cpu_seconds, rss_bytes) of a process, or (None, None) if unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+        ticks = os.sysconf("SC_CLK_TCK")
+        return (int(fields[11]) + int(fields[12])) / ticks, rss_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil  # optional, for non-Linux hosts
+        p = psutil.Process(pid)
+        cpu = p.cpu_times()
+        return cpu.user + cpu.system, p.memory_info().rss
+    except Exception:
+        return None, None
+
+
+class Child:
+    def __init__(self, file):
+        self.file = file
+        self.port = SERVICE_PORTS.get(file)
+        self.proc = None
+        self.state = "stopped"
+        self.restarts = 0
+        self.started_at = None
+        self.last_exit = None
+        self.backoff = BACKOFF_INITIAL_SEC
+        self.next_start = 0.0
+        self.health_fails = 0
+        self._cpu_sample = None    # (wall, cpu_seconds) for cpu_percent
+
+    def start(self):
+        print(f"🚀 Running {self.file} ...")
+        self.proc = subprocess.Popen([sys.executable, self.file], cwd=HERE)
+        self.started_at = time.time()
+        self.state = "starting" if self.port else "running"
+        self.health_fails = 0
+        self._cpu_sample = None
+
+    def wait_ready(self, timeout=READY_TIMEOUT_SEC):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                return False
+            if port_open(self.port):
+                self.state = "ready"
+                return True
+            time.sleep(0.25)
+        print(f"⚠️ {self.file} not listening on :{self.port} after {timeout:.0f}s")
+        return False
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(STOP_GRACE_SEC)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self.state = "stopped"
+
+    def schedule_restart(self, reason):
+        ran_for = time.time() - (self.started_at or time.time())
+        if ran_for >= STABLE_AFTER_SEC:
+            self.backoff = BACKOFF_INITIAL_SEC
+        self.last_exit = reason
+        self.state = "backoff"
+        self.next_start = time.time() + self.backoff
+        print(f"🔁 {self.file}: {reason}; restarting in {self.backoff:.0f}s")
+        self.backoff = min(self.backoff * 2, BACKOFF_MAX_SEC)
+
+    def status(self):
+        pid = self.proc.pid if self.proc and self.proc.poll() is None else None
+        cpu_seconds, rss = process_usage(pid) if pid else (None, None)
+        cpu_percent = None
+        now = time.time()
+        if cpu_seconds is not None:
+            if self._cpu_sample:
+                wall, prev = self._cpu_sample
+                if now > wall:
+                    cpu_percent = round(100.0 * (cpu_seconds - prev) / (now - wall), 1)
+            self._cpu_sample = (now, cpu_seconds)
+        return {
+            "service": self.file,
+            "port": self.port,
+            "pid": pid,
+            "state": self.state,
+            "restarts": self.restarts,
+            "uptime_sec": round(now - self.started_at, 1) if pid and self.started_at else None,
+            "last_exit": self.last_exit,
+            "cpu_seconds": round(cpu_seconds, 2) if cpu_seconds is not None else None,
+            "cpu_percent": cpu_percent,
+            "rss_mb": round(rss / 1048576, 1) if rss is not None else None,
+        }
+
+
+class Supervisor:
+    def __init__(self, files):
+        self.children = [Child(f) for f in files]
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def start_all(self):
+        # Staggered: each Flask service must answer on its port before the next one starts
+        for child in self.children:
+            if self.stopping.is_set():
+                return
+            with self.lock:
+                child.start()
+            if child.port and not child.wait_ready():
+                with self.lock:
+                    code = child.proc.poll()
+                    child.stop()
+                    child.schedule_restart(f"exited with code {code}" if code is not None else "not ready")
+            time.sleep(STAGGER_SEC)
+
+    def check(self):
+        now = time.time()
+        with self.lock:
+            for child in self.children:
+                if child.state == "backoff":
+                    if now >= child.next_start:
+                        child.restarts += 1
+                        child.start()
+                    continue
+                if child.proc is None:
+                    continue
+                code = child.proc.poll()
+                if code is not None:
+                    child.schedule_restart(f"exited with code {code}")
+                    continue
+                if child.port:
+                    if port_open(child.port):
+                        child.state = "ready"
+                        child.health_fails = 0
+                    elif child.state == "ready" or now - child.started_at > READY_TIMEOUT_SEC:
+                        child.health_fails += 1
+                        if child.health_fails >= HEALTH_FAILS_TO_RESTART:
+                            child.stop()
+                            child.schedule_restart(f"port {child.port} unresponsive")
+
+    def status(self):
+        with self.lock:
+            return [c.status() for c in self.children]
+
+    def stop_all(self):
+        self.stopping.set()
+        with self.lock:
+            for child in reversed(self.children):
+                child.stop()
+
+    def run(self):
+        self.start_all()
+        while not self.stopping.wait(HEALTH_INTERVAL_SEC):
+            self.check()
+
+
+def serve_status(status_fn):
+    status_app = Flask("supervisor")
+
+    @status_app.route('/supervisor/status', methods=['GET'])
+    def supervisor_status():
+        return jsonify({"data": status_fn(), "success": True}), 200
+
+    server = make_server(BIND_HOST, SUPERVISOR_PORT, status_app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="supervisor-status", daemon=True).start()
+    return server
+
+
+def run_supervised():
+    supervisor = Supervisor(files_to_run)
+
+    def shutdown(signum, frame):
+        print("🚪 Stopping services...")
+        supervisor.stopping.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    serve_status(supervisor.status)
+    try:
+        supervisor.run()
+    finally:
+        supervisor.stop_all()
+
+
+def run_single():
+    """Load every service module here; Flask apps on their own ports, streamers on asyncio threads."""
+    sys.path.insert(0, HERE)
+    os.chdir(HERE)
+    threads = {}
+
+    for file in files_to_run:
+        name = file[:-3]
+        print(f"🚀 Loading {file} ...")
+        module = importlib.import_module(name)
+        # Workers a service runs next to its app (started by its __main__ when run on its own)
+        if hasattr(module, "start_background"):
+            module.start_background()
+        port = SERVICE_PORTS.get(file)
+        if port:
+            server = make_server(BIND_HOST, port, module.app, threaded=True)
+            target = server.serve_forever
+        elif getattr(module, "HANDOFF_MODE", "files") == "spool":
+            target = lambda m=module: asyncio.run(m.process_spool())
+        elif getattr(module, "HANDOFF_MODE", "files") == "segments" and hasattr(module, "process_segments"):
+            target = lambda m=module: asyncio.run(m.process_segments())
+        else:
+            target = lambda m=module: asyncio.run(m.process_files())
+        threads[file] = threading.Thread(target=target, name=name, daemon=True)
+        threads[file].start()
+        if port:
+            deadline = time.time() + READY_TIMEOUT_SEC
+            while not port_open(port) and time.time() < deadline:
+                time.sleep(0.1)
+
+    def status():
+        cpu_seconds, rss = process_usage(os.getpid())
+        return [{
+            "service": file,
+            "port": SERVICE_PORTS.get(file),
+            "pid": os.getpid(),
+            "state": "running" if t.is_alive() else "stopped",
+            "cpu_seconds": round(cpu_seconds, 2) if cpu_seconds is not None else None,
+            "rss_mb": round(rss / 1048576, 1) if rss is not None else None,
+        } for file, t in threads.items()]
+
+    serve_status(status)
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    reported = set()
+    while not stop.wait(HEALTH_INTERVAL_SEC):
+        for file, t in threads.items():
+            if not t.is_alive() and file not in reported:
+                reported.add(file)
+                print(f"⚠️ {file} stopped in single-process mode; restart main.py to recover")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run and supervise the backend services.")
+    parser.add_argument("--single", action="store_true", help="run every service in one interpreter")
+    args = parser.parse_args()
+    if args.single:
+        run_single()
+    else:
+        run_supervised()
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Host-monitoring engine shared by Api_Alert, historic_alarm and Ping_satatus.
+
+The engine owns probing and hysteresis and, after every sweep, publishes an
+event to the subscribers registered in this process:
+
+    {"ts": datetime, "alerts": [...], "raised": [labels], "cleared": [labels]}
+
+Across processes only one engine probes: the first to take the leader lock
+sweeps the hosts and writes its state to STATE_FILE; the others follow that
+file and publish the same events locally. If the leader exits, a follower
+takes the lock over on its next tick and carries on from the shared state.
+"""
+from datetime import datetime
+import asyncio, json, math, os, queue, tempfile, threading, time
+import numpy as np
+import probe_engine
+import netcheck
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ========= Tunables (safe for high latency links) =========
+PING_COUNT = 2                     # echoes per probe
+PING_TIMEOUT_MS = 600              # per-echo timeout
+
+RAISE_AFTER_FAILS = 3              # N consecutive failed checks to raise
+CLEAR_AFTER_SUCCESSES = 2          # M consecutive successes to clear
+MIN_HOLD_SECONDS = 15              # keep alert raised at least this long
+
+SWEEP_PERIOD_SEC = 1.0             # publish period (and probe interval of a raised, still-down host)
+INTERNET_CHECK_PERIOD_SEC = 5.0    # internet check frequency
+INTERNET_SOCKET_TIMEOUT = 2.0      # tolerate ~1–2 s RTT
+
+# ---- Adaptive probe scheduling (per host) ----
+FAST_INTERVAL_SEC = 0.25           # failing, flapping or recovering hosts
+MAX_INTERVAL_SEC = 2.0             # ceiling for hosts that have been stable a while
+STABLE_AFTER_OKS = 5               # consecutive successes before backing off
+BACKOFF_FACTOR = 1.5               # interval growth per stable probe
+JITTER = 0.1                       # +/- fraction applied to every interval
+TICK_SEC = 0.05                    # timing-wheel resolution
+WHEEL_SLOTS = 256                  # TICK_SEC * WHEEL_SLOTS must exceed the longest interval
+
+STATE_FILE = os.getenv("MONITOR_STATE_FILE", os.path.join(tempfile.gettempdir(), "vessel604_monitor.npz"))
+LEADER_LOCK_FILE = STATE_FILE + ".lock"
+HOSTS_FILE = os.getenv("MONITOR_HOSTS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "hosts.json"))
+
+# Used when HOSTS_FILE is missing
+DEFAULT_HOSTS = [
+    {"name": "MDC",      "ip": "172.168.0.80"},
+    {"name": "PRAXIS", "ip": "192.168.1.101"},
+]
+
+def load_hosts(path=HOSTS_FILE):
+    """
+    [{"name", "ip"}, ...] from a JSON list in path, or DEFAULT_HOSTS if there is no such file.
+    An entry may also set "tcp_ports" and "tcp_refused_is_alive" for the engine's TCP
+    fallback (used where ICMP sockets are unavailable, e.g. Windows).
+    """
+    try:
+        with open(path) as f:
+            hosts = json.load(f)
+    except FileNotFoundError:
+        hosts = DEFAULT_HOSTS
+    for h in hosts:
+        if "tcp_ports" in h or "tcp_refused_is_alive" in h:
+            probe_engine.configure_host(str(h["ip"]), h.get("tcp_ports"), h.get("tcp_refused_is_alive"))
+    return [{"name": str(h["name"]), "ip": str(h["ip"])} for h in hosts]
+
+HOSTS = load_hosts()
+
+# ========= State (protect with lock) =========
+class HostTable:
+    """
+    Per-host monitor state as parallel NumPy arrays (one slot per host, in
+    HOSTS order), so a whole sweep's hysteresis is a handful of array ops
+    whether there are 2 hosts or 10,000. Epochs are float seconds, NaN = never.
+    """
+
+    ARRAYS = ("consec_fails", "consec_oks", "alert_active", "last_change",
+              "last_ping_ok", "last_result_ts", "last_rtt_ms", "last_loss", "interval")
+
+    def __init__(self, hosts):
+        n = len(hosts)
+        self.names = [h["name"] for h in hosts]
+        self.ips = [h["ip"] for h in hosts]
+        self.index = {ip: i for i, ip in enumerate(self.ips)}
+        self.consec_fails = np.zeros(n, np.int32)
+        self.consec_oks = np.zeros(n, np.int32)
+        self.alert_active = np.zeros(n, bool)
+        self.last_change = np.full(n, np.nan)
+        self.last_ping_ok = np.full(n, -1, np.int8)      # -1 = not probed yet
+        self.last_result_ts = np.full(n, np.nan)
+        self.last_rtt_ms = np.full(n, np.nan, np.float32)
+        self.last_loss = np.full(n, np.nan, np.float32)
+        self.interval = np.full(n, FAST_INTERVAL_SEC, np.float32)   # current probe interval
+
+    def __len__(self):
+        return len(self.ips)
+
+    def apply_hysteresis(self, up, ts, rtt_ms=None, loss=None, idx=None):
+        """
+        Results for the hosts at idx (default: all, in host order) at epoch ts.
+        Returns the mask of those hosts whose alert was raised or cleared.
+        """
+        sel = slice(None) if idx is None else idx
+        up = np.asarray(up, bool)
+        down = ~up
+        oks = np.where(up, self.consec_oks[sel] + 1, 0)
+        fails = np.where(down, self.consec_fails[sel] + 1, 0)
+        alert = self.alert_active[sel]
+        last_change = self.last_change[sel]
+        held_long_enough = np.isnan(last_change) | (ts - last_change >= MIN_HOLD_SECONDS)
+        cleared = alert & up & (oks >= CLEAR_AFTER_SUCCESSES) & held_long_enough
+        raised = ~alert & down & (fails >= RAISE_AFTER_FAILS)
+        self.consec_oks[sel] = oks
+        self.consec_fails[sel] = fails
+        self.alert_active[sel] = (alert & ~cleared) | raised
+        self.last_change[sel] = np.where(cleared | raised, ts, last_change)
+        self.last_ping_ok[sel] = up
+        self.last_result_ts[sel] = ts
+        if rtt_ms is not None:
+            self.last_rtt_ms[sel] = rtt_ms
+        if loss is not None:
+            self.last_loss[sel] = loss
+        return cleared | raised
+
+    def adapt_intervals(self, idx):
+        """
+        Next probe interval for the hosts at idx, from their latest state:
+        probe fast while failing (to confirm an outage), recovering or
+        flapping; back off towards MAX_INTERVAL_SEC while stable; a raised
+        host that is still down is checked every SWEEP_PERIOD_SEC.
+        """
+        up = self.last_ping_ok[idx] == 1
+        alert = self.alert_active[idx]
+        stable = up & ~alert & (self.consec_oks[idx] >= STABLE_AFTER_OKS)
+        backed_off = np.minimum(self.interval[idx] * BACKOFF_FACTOR, MAX_INTERVAL_SEC)
+        interval = np.where(stable, backed_off, FAST_INTERVAL_SEC)
+        interval = np.where(alert & ~up, SWEEP_PERIOD_SEC, interval)
+        self.interval[idx] = interval
+        return interval
+
+    def row(self, i):
+        """Host i as the dict the HTTP views render (datetimes, None for never)."""
+        def dt(v):
+            return None if math.isnan(v) else datetime.fromtimestamp(v)
+        def num(v):
+            return None if math.isnan(v) else round(float(v), 3)
+        return {
+            "name": self.names[i],
+            "ip": self.ips[i],
+            "consec_fails": int(self.consec_fails[i]),
+            "consec_oks": int(self.consec_oks[i]),
+            "alert_active": bool(self.alert_active[i]),
+            "last_change": dt(self.last_change[i]),
+            "last_ping_ok": None if self.last_ping_ok[i] < 0 else bool(self.last_ping_ok[i]),
+            "last_result_ts": dt(self.last_result_ts[i]),
+            "last_rtt_ms": num(self.last_rtt_ms[i]),
+            "last_loss": num(self.last_loss[i]),
+        }
+
+    def rows(self):
+        return [self.row(i) for i in range(len(self))]
+
+state_lock = threading.Lock()
+hosts = HostTable(HOSTS)
+internet_state = {"ok": True, "last_checked": None}
+current_alerts = []
+active_labels = set()
+role = None                        # "leader" or "follower" once the loop runs
+
+_subscribers = []
+_started = False
+_start_lock = threading.Lock()
+
+# ========= Helpers =========
+def now_str(dt=None):
+    return (dt or datetime.now()).strftime("%H:%M:%S %d-%m-%Y")
+
+def check_internet_fast(timeout=INTERNET_SOCKET_TIMEOUT):
+    """Shared, TTL-cached answer from netcheck (all DNS targets raced in parallel)."""
+    return netcheck.is_online(timeout=timeout)
+
+def ping_ok(ip):
+    """
+    Echo probe via the shared engine. Returns True if majority of replies succeed.
+    """
+    return probe_engine.ping_ok(ip, count=PING_COUNT, timeout=PING_TIMEOUT_MS / 1000.0)
+
+def host_rows():
+    """Snapshot of every host as dicts (see HostTable.row)."""
+    with state_lock:
+        return hosts.rows()
+
+def compute_alerts(ts):
+    alerts = []
+    if not internet_state["ok"]:
+        alerts.append({"label": "No internet connection available", "time": now_str(ts)})
+    for i in np.flatnonzero(hosts.alert_active):
+        alerts.append({"label": f"{hosts.names[i]} Disconnected.", "time": now_str(ts)})
+    return alerts
+
+# ========= Publish / subscribe =========
+def subscribe(callback):
+    """Call callback(event) after every sweep, from the monitor thread, outside state_lock."""
+    _subscribers.append(callback)
+
+def _publish(ts):
+    global current_alerts, active_labels
+    with state_lock:
+        alerts = compute_alerts(ts)
+        labels = {a["label"] for a in alerts}
+        event = {
+            "ts": ts,
+            "alerts": alerts,
+            "raised": [a["label"] for a in alerts if a["label"] not in active_labels],
+            "cleared": sorted(active_labels - labels),
+        }
+        current_alerts = alerts
+        active_labels = labels
+    for callback in list(_subscribers):
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"Monitor subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+
+# ========= Cross-process sharing =========
+def _try_lead():
+    """Non-blocking attempt at the leader lock; the open handle holds it for the process lifetime."""
+    fh = open(LEADER_LOCK_FILE, "a+")
+    try:
+        if fcntl:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return fh
+    except OSError:
+        fh.close()
+        return None
+
+def _write_state(ts):
+    with state_lock:
+        arrays = {name: getattr(hosts, name).copy() for name in HostTable.ARRAYS}
+        last_checked = internet_state["last_checked"]
+        meta = np.array([
+            ts.timestamp(),
+            float(internet_state["ok"]),
+            last_checked.timestamp() if last_checked else np.nan,
+        ])
+    tmp = f"{STATE_FILE}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, meta=meta, ips=np.array(hosts.ips), **arrays)
+    os.replace(tmp, STATE_FILE)
+
+def _read_state(last_ts):
+    """Adopt the leader's latest state if it is newer than last_ts; returns its ts or None."""
+    try:
+        with np.load(STATE_FILE) as snapshot:
+            data = {name: snapshot[name] for name in snapshot.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    ts, ok, last_checked = data["meta"]
+    if ts == last_ts:
+        return None
+    ips = data["ips"].tolist()
+    with state_lock:
+        internet_state["ok"] = bool(ok)
+        internet_state["last_checked"] = None if math.isnan(last_checked) else datetime.fromtimestamp(last_checked)
+        if ips == hosts.ips:
+            for name in HostTable.ARRAYS:
+                setattr(hosts, name, data[name].astype(getattr(hosts, name).dtype))
+        else:
+            # Leader runs a different host list: copy the hosts both know
+            mine = [hosts.index.get(ip, -1) for ip in ips]
+            src = np.array([k for k, i in enumerate(mine) if i >= 0], dtype=np.intp)
+            dst = np.array([i for i in mine if i >= 0], dtype=np.intp)
+            for name in HostTable.ARRAYS:
+                getattr(hosts, name)[dst] = data[name][src]
+    return float(ts)
+
+# ========= Probe scheduler =========
+class TimingWheel:
+    """Hashed timing wheel of host indices; O(1) schedule, O(due) advance."""
+
+    def __init__(self, tick=TICK_SEC, slots=WHEEL_SLOTS, now=None):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.cursor = int((time.time() if now is None else now) / tick)
+
+    def schedule(self, item, at):
+        # Never in the past, never a full turn ahead
+        t = min(max(int(at / self.tick), self.cursor + 1), self.cursor + len(self.slots) - 1)
+        self.slots[t % len(self.slots)].append(item)
+
+    def advance(self, now):
+        """Items due up to now."""
+        due = []
+        target = int(now / self.tick)
+        while self.cursor < target:
+            self.cursor += 1
+            slot = self.slots[self.cursor % len(self.slots)]
+            due.extend(slot)
+            slot.clear()
+        return due
+
+class ProbeScheduler:
+    """
+    Per-host probe timing for the leader: each host sits in the wheel at
+    its own (jittered) interval and is probed when due, independently of
+    slower hosts. Clock-free, so it can be driven by a simulated clock.
+    """
+
+    def __init__(self, table, now):
+        self.table = table
+        self.wheel = TimingWheel(now=now)
+        # Spread the first round over one period instead of bursting
+        for i, phase in enumerate(np.random.random(len(table))):
+            self.wheel.schedule(i, now + float(phase) * SWEEP_PERIOD_SEC)
+
+    def due(self, now):
+        return np.array(self.wheel.advance(now), dtype=np.intp)
+
+    def complete(self, idx, up, now, rtt_ms=None, loss=None):
+        """Apply probe results for hosts idx; returns True if any alert changed."""
+        with state_lock:
+            changed = self.table.apply_hysteresis(up, now, rtt_ms, loss, idx=idx)
+            interval = self.table.adapt_intervals(idx)
+        self._reschedule(idx, interval, now)
+        return bool(changed.any())
+
+    def failed(self, idx, now):
+        """The probe itself errored: leave the state alone and try again later."""
+        self._reschedule(idx, np.full(len(idx), SWEEP_PERIOD_SEC), now)
+
+    def _reschedule(self, idx, interval, now):
+        jitter = np.random.uniform(1 - JITTER, 1 + JITTER, len(idx))
+        for i, at in zip(idx.tolist(), (now + interval * jitter).tolist()):
+            self.wheel.schedule(i, at)
+
+# ========= Background monitor =========
+def internet_loop(stop_event: threading.Event):
+    """Leader only: refresh internet_state every INTERNET_CHECK_PERIOD_SEC."""
+    while not stop_event.is_set():
+        try:
+            ok = check_internet_fast()
+        except Exception as e:
+            # Keep the thread (and internet_state) alive; the next period retries
+            print(f"Monitor internet check failed: {e}")
+            stop_event.wait(INTERNET_CHECK_PERIOD_SEC)
+            continue
+        with state_lock:
+            internet_state["ok"] = ok
+            internet_state["last_checked"] = datetime.now()
+        stop_event.wait(INTERNET_CHECK_PERIOD_SEC)
+
+def share(ts):
+    try:
+        _write_state(ts)
+    except OSError as e:
+        print(f"Monitor could not share state: {e}")
+    _publish(ts)
+
+def lead(stop_event: threading.Event):
+    """Probe hosts as they come due; publish every SWEEP_PERIOD_SEC and at once on alert changes."""
+    engine = probe_engine.get_engine()
+    completed = queue.Queue()
+    scheduler = ProbeScheduler(hosts, time.time())
+    threading.Thread(target=internet_loop, args=(stop_event,), name="monitor-internet", daemon=True).start()
+    next_publish = 0.0
+
+    def on_done(fut, idx):
+        completed.put((idx, fut))
+
+    while not stop_event.is_set():
+        now = time.time()
+        idx = scheduler.due(now)
+        if len(idx):
+            fut = asyncio.run_coroutine_threadsafe(
+                engine.aprobe_many([hosts.ips[i] for i in idx], count=PING_COUNT, timeout=PING_TIMEOUT_MS / 1000.0),
+                engine.loop,
+            )
+            fut.add_done_callback(lambda f, idx=idx: on_done(f, idx))
+
+        changed = False
+        while True:
+            try:
+                idx, fut = completed.get_nowait()
+            except queue.Empty:
+                break
+            now = time.time()
+            try:
+                results = fut.result()
+            except Exception as e:
+                print(f"Monitor probe of {len(idx)} hosts failed: {e}")
+                scheduler.failed(idx, now)
+                continue
+            ordered = [results[hosts.ips[i]] for i in idx]
+            up = np.fromiter((r.up for r in ordered), bool, len(ordered))
+            rtt_ms = np.fromiter((np.nan if r.avg_rtt_ms is None else r.avg_rtt_ms for r in ordered), np.float32, len(ordered))
+            loss = np.fromiter((r.loss for r in ordered), np.float32, len(ordered))
+            changed |= scheduler.complete(idx, up, now, rtt_ms, loss)
+
+        if changed or now >= next_publish:
+            share(datetime.now())
+            next_publish = time.time() + SWEEP_PERIOD_SEC
+        stop_event.wait(TICK_SEC)
+
+def follow(stop_event: threading.Event):
+    """Publish the leader's state whenever its file changes; return when the leader lock is ours."""
+    followed_ts = None
+    last_mtime = None
+    next_try = time.time() + SWEEP_PERIOD_SEC
+    while not stop_event.is_set():
+        try:
+            mtime = os.stat(STATE_FILE).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != last_mtime:
+            last_mtime = mtime
+            new_ts = _read_state(followed_ts)
+            if new_ts is not None:
+                followed_ts = new_ts
+                _publish(datetime.fromtimestamp(new_ts))
+        if time.time() >= next_try:
+            next_try = time.time() + SWEEP_PERIOD_SEC
+            lock_handle = _try_lead()
+            if lock_handle:
+                return lock_handle
+        stop_event.wait(TICK_SEC)
+
+def monitor_loop(stop_event: threading.Event):
+    global role
+    lock_handle = _try_lead()
+    if lock_handle is None:
+        role = "follower"
+        lock_handle = follow(stop_event)
+    if lock_handle:
+        role = "leader"
+        lead(stop_event)
+
+stop_flag = threading.Event()
+
+def start():
+    """Start the monitor thread once per process (safe to call from every module)."""
+    global _started
+    with _start_lock:
+        if not _started:
+            _started = True
+            threading.Thread(target=monitor_loop, args=(stop_flag,), name="monitor", daemon=True).start()
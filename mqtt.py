@@ -1,7 +1,15 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
+import fnmatch
+import hashlib
 import json
+import math
 import os
+import queue
+import threading
+import time
+from datetime import datetime
+import mqtt_store
 
 app = Flask(__name__)
 CORS(app)
@@ -9,9 +17,165 @@ CORS(app)
 # Path to your JSON file
 JSON_FILE_PATH = r"C:\Mqtt\__data\mqtt_live_data.json"
 
+MAX_CACHED_BLOCKS = 64    # unknown ?block= values must not grow the cache without bound
+
+STREAM_POLL_SEC = 0.25        # how often the live feed stats the JSON file
+STREAM_HEARTBEAT_SEC = 15     # SSE comment to keep idle connections open
+STREAM_CLIENT_BACKLOG = 100   # deltas buffered per client before it is resynced
+
+# Register history (see mqtt_store.py); one process per store records, the others only read
+HISTORY_DIR = os.getenv("MQTT_HISTORY_DIR", r"./mqtt_history")
+HISTORY_ENABLED = os.getenv("MQTT_HISTORY", "1") == "1"
+HISTORY_SAMPLE_SEC = 1.0      # how often the recorder checks the JSON file for a new version
+HISTORY_RETENTION_DAYS = float(os.getenv("MQTT_HISTORY_RETENTION_DAYS", "14"))
+HISTORY_DEFAULT_SPAN_SEC = 3600
+HISTORY_DEFAULT_POINTS = 600  # buckets per series when ?bucket= is not given
+HISTORY_MAX_POINTS = 5000
+HISTORY_MAX_KEYS = 20
+
+# Register -> block mapping: {block: [register name or fnmatch pattern, ...]}.
+# Compiled into an index of each block's registers (in file order) whenever the
+# file's set of registers or the mapping changes, so a request only touches its block.
+BLOCKS_FILE = os.getenv("MQTT_BLOCKS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "mqtt_blocks.json"))
+# Used when BLOCKS_FILE is missing: every register is "miscellaneous"
+DEFAULT_BLOCKS = {"miscellaneous": ["*"]}
+
+# Parsed file, block index and pre-serialized responses, valid while the file's (mtime, size) is unchanged
+cache_lock = threading.Lock()
+file_cache = {
+    "sig": None, "data": None,
+    "blocks_sig": None, "blocks": None,
+    "index_keys": None, "index": {}, "members": {},
+    "responses": {},
+}
+
+
+def file_signature():
+    st = os.stat(JSON_FILE_PATH)
+    return (st.st_mtime_ns, st.st_size), st.st_mtime
+
+
+def blocks_signature():
+    try:
+        st = os.stat(BLOCKS_FILE)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_blocks(path=BLOCKS_FILE):
+    """{block: [register or pattern, ...]} from path, or DEFAULT_BLOCKS if there is no such file."""
+    try:
+        with open(path) as f:
+            blocks = json.load(f)
+    except FileNotFoundError:
+        return dict(DEFAULT_BLOCKS)
+    return {str(name): [str(p) for p in patterns] for name, patterns in blocks.items()}
+
+
+def compile_index(keys, blocks):
+    """{block: [registers in file order]}; exact names are set lookups, patterns go through fnmatch."""
+    index = {}
+    for name, patterns in blocks.items():
+        exact = {p for p in patterns if not any(c in p for c in "*?[")}
+        globs = [p for p in patterns if p not in exact]
+        index[name] = [
+            k for k in keys if k in exact or any(fnmatch.fnmatchcase(k, g) for g in globs)
+        ]
+    return index
+
+
+def build_block(block, keys, data, index, members):
+    """
+    (status, body) for a block and/or a ?keys= projection; serialized once per
+    file version and costing O(registers returned), not O(file).
+    """
+    if (block and block not in index) or (not block and keys is None):
+        return 200, app.json.dumps({
+            "data": [],
+            "success": False,
+            "message": f"No dummy data available for block '{block}'"
+        })
+    if keys is None:
+        selected = index[block]
+    else:
+        in_block = members[block] if block else data
+        selected = [k for k in keys if k in data and k in in_block]
+    result = {
+        "data": [{"title": k, "value": data[k]} for k in selected],
+        "success": True
+    }
+    if keys is not None and len(selected) < len(keys):
+        found = set(selected)
+        result["missing"] = [k for k in keys if k not in found]
+    return 200, app.json.dumps(result)
+
+
+def refresh_blocks():
+    """Reload BLOCKS_FILE if it changed; caller holds cache_lock. Forces a recompile of the index."""
+    blocks_sig = blocks_signature()
+    if file_cache["blocks"] is not None and file_cache["blocks_sig"] == blocks_sig:
+        return
+    try:
+        blocks = load_blocks()
+    except (ValueError, AttributeError, TypeError) as e:
+        print(f"Ignoring invalid {BLOCKS_FILE}: {e}")
+        blocks = file_cache["blocks"] or dict(DEFAULT_BLOCKS)
+    file_cache.update(blocks_sig=blocks_sig, blocks=blocks, index_keys=None, responses={})
+
+
+def refresh_cache():
+    """Re-parse the JSON file (and the block mapping) if changed since the last read. Returns the file's mtime."""
+    with cache_lock:
+        # The mapping first: it must be known even while the JSON file does not exist yet
+        refresh_blocks()
+    sig, mtime = file_signature()
+    with cache_lock:
+        stale = file_cache["index_keys"] is None
+        if file_cache["sig"] != sig:
+            # Load JSON file
+            with open(JSON_FILE_PATH, "r") as file:
+                json_data = json.load(file)
+            file_cache.update(sig=sig, data=json_data.get("data", {}), responses={})
+            stale = True
+        # Values change every second, the set of registers rarely: only then recompile
+        keys = list(file_cache["data"]) if stale else file_cache["index_keys"]
+        if keys != file_cache["index_keys"]:
+            index = compile_index(keys, file_cache["blocks"])
+            file_cache.update(
+                index_keys=keys, index=index,
+                members={name: frozenset(regs) for name, regs in index.items()},
+            )
+    return mtime
+
+
+def cached_block(block, keys=None):
+    """Return (status, body, etag, mtime); the JSON file is only parsed when it changes."""
+    mtime = refresh_cache()
+    cache_key = (block, tuple(keys) if keys is not None else None)
+    with cache_lock:
+        entry = file_cache["responses"].get(cache_key)
+        if entry is None:
+            status, body = build_block(block, keys, file_cache["data"], file_cache["index"], file_cache["members"])
+            etag = hashlib.blake2b(body.encode(), digest_size=12).hexdigest()
+            entry = (status, body, etag, mtime)
+            if len(file_cache["responses"]) < MAX_CACHED_BLOCKS:
+                file_cache["responses"][cache_key] = entry
+        return entry
+
+
+def parse_keys(value):
+    """?keys=a,b as a list (None when absent)."""
+    if value is None:
+        return None
+    return [k for k in value.split(",") if k]
+
+
 @app.route('/api/app/mqtt/data/', methods=['GET'])
 def mqtt_data_dummy():
+    """Registers of ?block= (see BLOCKS_FILE); ?keys=a,b returns only those registers."""
     block = request.args.get("block", "")
+    keys = parse_keys(request.args.get("keys"))
 
     if not os.path.exists(JSON_FILE_PATH):
         return jsonify({
@@ -21,35 +185,7 @@ def mqtt_data_dummy():
         }), 500
 
     try:
-        # Load JSON file
-        with open(JSON_FILE_PATH, "r") as file:
-            json_data = json.load(file)
-
-        # Convert JSON into the required format
-        records = []
-        for key, value in json_data.get("data", {}).items():
-            records.append({
-                # "register_no": key.upper(),  # optional, can adjust
-                "title": key,
-                # "data_type": type(value).__name__,  # e.g., int, float
-                "value": value,
-                # "unit": ""  # unit is not in file, so empty
-            })
-
-        if block == "miscellaneous":
-            dummy_data = {
-                "data": records,
-                "success": True
-            }
-        else:
-            dummy_data = {
-                "data": [],
-                "success": False,
-                "message": f"No dummy data available for block '{block}'"
-            }
-
-        return jsonify(dummy_data), 200
-
+        status, body, etag, mtime = cached_block(block, keys)
     except Exception as e:
         return jsonify({
             "data": [],
@@ -57,6 +193,259 @@ def mqtt_data_dummy():
             "message": f"Error reading JSON file: {str(e)}"
         }), 500
 
+    # Clients revalidate with If-None-Match / If-Modified-Since and get 304 while unchanged
+    response = Response(body, status=status, mimetype="application/json")
+    response.set_etag(etag)
+    response.last_modified = mtime
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+class LiveFeed:
+    """
+    One watcher thread for all stream clients: stats the JSON file, and on change
+    publishes only the keys whose values changed (plus removed keys) to every
+    subscriber queue. Started on the first subscription.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.data = {}
+        self.subscribers = set()
+        self.thread = None
+
+    def subscribe(self):
+        """Returns (queue, version, full data snapshot)."""
+        q = queue.Queue(maxsize=STREAM_CLIENT_BACKLOG)
+        with self.lock:
+            if self.thread is None:
+                self._poll()
+                self.thread = threading.Thread(target=self._run, name="mqtt-live-feed", daemon=True)
+                self.thread.start()
+            self.subscribers.add(q)
+            return q, self.version, dict(self.data)
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def snapshot(self):
+        with self.lock:
+            return self.version, dict(self.data)
+
+    def _poll(self):
+        """Pick up a new file version; caller holds self.lock."""
+        try:
+            refresh_cache()
+        except (OSError, ValueError):
+            return  # missing or half-written file: keep the last good state
+        with cache_lock:
+            new = file_cache["data"]
+        if new is self.data:
+            return
+        changed = {k: v for k, v in new.items() if k not in self.data or self.data[k] != v}
+        removed = [k for k in self.data if k not in new]
+        self.data = new
+        if not changed and not removed:
+            return
+        self.version += 1
+        delta = (self.version, changed, removed)
+        for q in self.subscribers:
+            try:
+                q.put_nowait(delta)
+            except queue.Full:
+                # Slow client: drop its backlog and let it resync from a snapshot
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)
+
+    def _run(self):
+        while True:
+            time.sleep(STREAM_POLL_SEC)
+            with self.lock:
+                if self.subscribers:
+                    self._poll()
+
+
+live_feed = LiveFeed()
+
+
+def sse(event, payload, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {app.json.dumps(payload)}\n\n"
+
+
+def as_records(data):
+    return [{"title": key, "value": value} for key, value in data.items()]
+
+
+@app.route('/api/app/mqtt/stream/', methods=['GET'])
+def mqtt_stream():
+    """
+    Server-Sent Events: a "snapshot" event with every record of ?block= (and/or
+    ?keys=) on connect, then "delta" events carrying only its changed/removed keys.
+    """
+    block = request.args.get("block", "")
+    keys = parse_keys(request.args.get("keys"))
+    try:
+        refresh_cache()
+    except (OSError, ValueError):
+        pass  # no file yet: the feed starts empty
+    with cache_lock:
+        known = block in file_cache["blocks"]
+    if (block and not known) or (not block and keys is None):
+        return jsonify({
+            "data": [],
+            "success": False,
+            "message": f"No dummy data available for block '{block}'"
+        }), 404
+
+    def select(data):
+        """The registers of data this client asked for (block index as of now, then ?keys=)."""
+        with cache_lock:
+            members = file_cache["members"].get(block, frozenset()) if block else None
+        return {
+            k: v for k, v in data.items()
+            if (members is None or k in members) and (keys is None or k in keys)
+        }
+
+    if keys is not None:
+        keys = frozenset(keys)
+    q, version, data = live_feed.subscribe()
+
+    def events():
+        try:
+            yield sse("snapshot", {"version": version, "data": as_records(select(data))}, version)
+            while True:
+                try:
+                    item = q.get(timeout=STREAM_HEARTBEAT_SEC)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    v, d = live_feed.snapshot()
+                    yield sse("snapshot", {"version": v, "data": as_records(select(d))}, v)
+                    continue
+                v, changed, removed = item
+                changed = select(changed)
+                removed = list(select(dict.fromkeys(removed)))
+                if changed or removed:
+                    yield sse("delta", {"version": v, "changed": as_records(changed), "removed": removed}, v)
+        finally:
+            live_feed.unsubscribe(q)
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def record_history():
+    """Append every new version of the JSON file to the history store (single writer per store)."""
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    lock = None
+    while lock is None:
+        lock = mqtt_store.try_lock(os.path.join(HISTORY_DIR, ".writer.lock"))
+        if lock is None:
+            time.sleep(5)   # another process records; take over if it goes away
+    writer = mqtt_store.StoreWriter(HISTORY_DIR)
+    last = None
+    last_error = None
+    next_prune = 0.0
+    while True:
+        time.sleep(HISTORY_SAMPLE_SEC)
+        try:
+            refresh_cache()
+            with cache_lock:
+                data = file_cache["data"]
+            if data is not last:
+                writer.append(data)
+                last = data
+            writer.maybe_flush()
+            if time.time() >= next_prune:
+                writer.prune(HISTORY_RETENTION_DAYS)
+                next_prune = time.time() + 3600
+            last_error = None
+        except (OSError, ValueError) as e:
+            if str(e) != last_error:
+                print(f"History recorder: {e}")
+                last_error = str(e)
+
+
+def start_background():
+    """Start the history recorder (called from __main__ / main.py, never on import)."""
+    if HISTORY_ENABLED:
+        threading.Thread(target=record_history, name="mqtt-history", daemon=True).start()
+
+
+def finite(value):
+    if not math.isfinite(value):
+        raise ValueError(f"{value} is not a finite number")
+    return value
+
+
+def parse_time(value, default):
+    """Epoch seconds or an ISO date/time; default when absent."""
+    if not value:
+        return default
+    try:
+        ts = float(value)
+    except ValueError:
+        ts = datetime.fromisoformat(value).timestamp()
+    return finite(ts)
+
+
+def parse_duration(value):
+    """Seconds from "90", "30s", "5m", "1h" or "1d"."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:].lower() in units:
+        return finite(float(value[:-1]) * units[value[-1].lower()])
+    return finite(float(value))
+
+
+@app.route('/api/app/mqtt/history', methods=['GET'])
+def mqtt_history():
+    """
+    Min/max/avg per time bucket for ?keys=a,b over ?from=&to= (epoch or ISO,
+    default the last hour). ?bucket= sets the bucket width ("60", "5m", "1h");
+    without it the range is cut into ?points= buckets (default 600).
+    """
+    keys = [k for k in request.args.get("keys", "").split(",") if k]
+    try:
+        # Beyond what the day partitions can be named for there is no data anyway;
+        # clamp 'to' before the default 'from' is derived from it
+        _, end = mqtt_store.clamp_range(0.0, parse_time(request.args.get("to"), time.time()))
+        start = parse_time(request.args.get("from"), end - HISTORY_DEFAULT_SPAN_SEC)
+        start, end = mqtt_store.clamp_range(start, end)
+        points = min(int(request.args.get("points", HISTORY_DEFAULT_POINTS)), HISTORY_MAX_POINTS)
+        bucket = request.args.get("bucket")
+        bucket_sec = parse_duration(bucket) if bucket else (end - start) / max(points, 1)
+    except (ValueError, OverflowError, OSError) as e:
+        return jsonify({"data": {}, "success": False, "message": f"Invalid parameter: {e}"}), 400
+    if not keys or len(keys) > HISTORY_MAX_KEYS:
+        return jsonify({
+            "data": {},
+            "success": False,
+            "message": f"Pass between 1 and {HISTORY_MAX_KEYS} comma-separated keys"
+        }), 400
+    if end <= start:
+        return jsonify({"data": {}, "success": False, "message": "'from' must be before 'to'"}), 400
+    if bucket_sec <= 0:
+        return jsonify({"data": {}, "success": False, "message": "'bucket' must be positive"}), 400
+    # Never ship more points than the chart can draw
+    bucket_sec = max(bucket_sec, (end - start) / HISTORY_MAX_POINTS)
+
+    result = mqtt_store.history(HISTORY_DIR, keys, start, end, bucket_sec)
+    return jsonify({
+        "success": True,
+        "from": start,
+        "to": end,
+        "bucket_sec": bucket_sec,
+        **result,
+    }), 200
+
 
 if __name__ == '__main__':
+    start_background()
     app.run(host='172.168.0.81', port=5005, debug=True)
@@ -0,0 +1,286 @@
+"""
+Delta-encoded archive of mqtt_live_data.json snapshots.
+
+One pair of files per local day:
+
+  <YYYYMMDD>.mqa   frames [length][crc32][kind][payload]
+                     kind 1 keyframe: zlib(compact JSON {"t": epoch, "d": full data dict})
+                     kind 0 delta:    compact JSON {"t": epoch, "s": {changed keys}, "r": [removed keys]}
+  <YYYYMMDD>.mqi   one [epoch][file offset][kind] entry per frame, for bisecting by time
+
+Every day starts with a keyframe, and so does every KEYFRAME_EVERY-th frame,
+so reconstructing the data at any moment reads one keyframe and at most
+KEYFRAME_EVERY - 1 small deltas from one file. Snapshots identical to the
+previous one are not stored: the state at a time is the last frame at or
+before it. The .mqa is the source of truth; a torn tail left by a crash is
+cut off and the .mqi rebuilt when the writer reopens the day.
+
+    python mqtt_archive.py at <archive_dir> <ISO time>
+    python mqtt_archive.py import <snapshot_dir> <archive_dir>
+"""
+import bisect
+import gzip
+import json
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime
+
+KEYFRAME_EVERY = 60                   # frames between keyframes (one hour at one snapshot a minute)
+
+_FRAME = struct.Struct("!IIB")        # payload length, crc32, kind
+_INDEX = struct.Struct("!dQB")        # epoch, offset, kind
+DELTA, KEYFRAME = 0, 1
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y%m%d")
+
+
+def _paths(directory, day):
+    return os.path.join(directory, f"{day}.mqa"), os.path.join(directory, f"{day}.mqi")
+
+
+def _days(directory):
+    return sorted(n[:-4] for n in os.listdir(directory) if n.endswith(".mqa") and n[:-4].isdigit())
+
+
+def _encode(kind, frame):
+    data = json.dumps(frame, separators=(",", ":")).encode()
+    if kind == KEYFRAME:
+        data = zlib.compress(data, 6)
+    return _FRAME.pack(len(data), zlib.crc32(data), kind) + data
+
+
+def _read_frame(f):
+    """(kind, frame) at the file position, or None if the tail is incomplete/torn."""
+    header = f.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        return None
+    length, crc, kind = _FRAME.unpack(header)
+    data = f.read(length)
+    if len(data) < length or zlib.crc32(data) != crc:
+        return None
+    if kind == KEYFRAME:
+        data = zlib.decompress(data)
+    return kind, json.loads(data)
+
+
+def diff(old, new):
+    """(changed, removed) turning old into new."""
+    changed = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    removed = [k for k in old if k not in new]
+    return changed, removed
+
+
+class ArchiveWriter:
+    def __init__(self, directory, keyframe_every=KEYFRAME_EVERY):
+        self.directory = directory
+        self.keyframe_every = keyframe_every
+        self._day = None
+        self._log = None
+        self._idx = None
+        self._last = None             # data dict as of the last frame written
+        self._last_t = 0.0
+        self._since_key = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self, day):
+        """Open a day for appending: truncate a torn tail and rebuild its index from the log."""
+        self.close()
+        log_path, idx_path = _paths(self.directory, day)
+        entries = []
+        good = 0
+        if os.path.exists(log_path):
+            with open(log_path, "rb") as f:
+                while True:
+                    pos = f.tell()
+                    got = _read_frame(f)
+                    if got is None:
+                        break
+                    kind, frame = got
+                    entries.append(_INDEX.pack(frame["t"], pos, kind))
+                    good = f.tell()
+                    # Keep the day's frames in time order across restarts
+                    self._last_t = max(self._last_t, frame["t"])
+            with open(log_path, "r+b") as f:
+                f.truncate(good)
+        with open(idx_path, "wb") as f:
+            f.write(b"".join(entries))
+        self._day = day
+        self._log = open(log_path, "ab")
+        self._idx = open(idx_path, "ab")
+        self._size = good
+        # Whatever came before (or a restart) the next frame is a keyframe
+        self._last = None
+
+    def append(self, data, ts=None):
+        """Archive one snapshot of the data dict. Returns "keyframe", "delta" or None (unchanged)."""
+        ts = max(time.time() if ts is None else ts, self._last_t)
+        day = _day(ts)
+        if day != self._day:
+            self._open(day)
+
+        if self._last is not None:
+            changed, removed = diff(self._last, data)
+            if not changed and not removed:
+                return None
+        if self._last is not None and self._since_key < self.keyframe_every:
+            kind, frame = DELTA, {"t": ts, "s": changed, "r": removed}
+            self._since_key += 1
+        else:
+            kind, frame = KEYFRAME, {"t": ts, "d": data}
+            self._since_key = 1
+
+        blob = _encode(kind, frame)
+        # Data before index: a crash can only leave the index short
+        self._log.write(blob)
+        self._log.flush()
+        self._idx.write(_INDEX.pack(ts, self._size, kind))
+        self._idx.flush()
+        self._size += len(blob)
+        self._last = dict(data)
+        self._last_t = ts
+        return "keyframe" if kind == KEYFRAME else "delta"
+
+    def prune(self, before_ts):
+        """Delete whole days that ended before before_ts. Returns how many."""
+        cutoff = _day(before_ts)
+        removed = 0
+        for day in _days(self.directory):
+            if day >= cutoff or day == self._day:
+                break
+            for path in _paths(self.directory, day):
+                if os.path.exists(path):
+                    os.remove(path)
+            removed += 1
+        return removed
+
+    def close(self):
+        for f in (self._log, self._idx):
+            if f:
+                f.close()
+        self._log = self._idx = None
+
+
+class ArchiveReader:
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = {}              # day -> (idx size, [epochs], [offsets], [kinds])
+
+    def _load_index(self, day):
+        _, idx_path = _paths(self.directory, day)
+        try:
+            size = os.path.getsize(idx_path)
+        except OSError:
+            return [], [], []
+        cached = self._index.get(day)
+        if cached and cached[0] == size:
+            return cached[1:]
+        with open(idx_path, "rb") as f:
+            raw = f.read(size - size % _INDEX.size)
+        epochs, offsets, kinds = [], [], []
+        for t, pos, kind in _INDEX.iter_unpack(raw):
+            epochs.append(t)
+            offsets.append(pos)
+            kinds.append(kind)
+        self._index[day] = (size, epochs, offsets, kinds)
+        return epochs, offsets, kinds
+
+    def _replay(self, day, first, last):
+        """Yield (t, data) for frames first..last of a day; first must be a keyframe."""
+        log_path, _ = _paths(self.directory, day)
+        _, offsets, _ = self._load_index(day)
+        data = {}
+        with open(log_path, "rb") as f:
+            f.seek(offsets[first])
+            for _ in range(first, last + 1):
+                got = _read_frame(f)
+                if got is None:
+                    return
+                kind, frame = got
+                if kind == KEYFRAME:
+                    data = dict(frame["d"])
+                else:
+                    data.update(frame["s"])
+                    for k in frame["r"]:
+                        data.pop(k, None)
+                yield frame["t"], data
+
+    def at(self, ts):
+        """(frame epoch, full data dict) in effect at epoch ts, or None if the archive starts later."""
+        days = _days(self.directory)
+        i = bisect.bisect_right(days, _day(ts)) - 1
+        while i >= 0:
+            day = days[i]
+            epochs, _, kinds = self._load_index(day)
+            n = bisect.bisect_right(epochs, ts) - 1
+            if n >= 0:
+                k = n
+                while k > 0 and kinds[k] != KEYFRAME:
+                    k -= 1
+                result = None
+                for t, data in self._replay(day, k, n):
+                    result = (t, dict(data))
+                return result
+            i -= 1
+        return None
+
+    def iter_range(self, start, end):
+        """Yield (frame epoch, full data dict) for every stored snapshot with start <= t < end."""
+        for day in _days(self.directory):
+            if day < _day(start):
+                continue
+            if day > _day(end):
+                break
+            epochs, _, kinds = self._load_index(day)
+            lo = bisect.bisect_left(epochs, start)
+            hi = bisect.bisect_left(epochs, end) - 1
+            if lo > hi:
+                continue
+            k = lo
+            while k > 0 and kinds[k] != KEYFRAME:
+                k -= 1
+            for t, data in self._replay(day, k, hi):
+                if t >= start:
+                    yield t, dict(data)
+
+
+def import_snapshots(snapshot_dir, archive_dir, base_name="Mdc_Tele", time_format="%Y-%m-%d_%H-%M-%S"):
+    """Fold existing Mdc_Tele_<time>.json[.gz] snapshots into a delta archive, oldest first."""
+    pattern = re.compile(rf"^{re.escape(base_name)}_(.+?)\.json(\.gz)?$")
+    snapshots = []
+    for name in os.listdir(snapshot_dir):
+        m = pattern.match(name)
+        if m:
+            try:
+                snapshots.append((datetime.strptime(m.group(1), time_format).timestamp(), name))
+            except ValueError:
+                continue
+    writer = ArchiveWriter(archive_dir)
+    counts = {"keyframe": 0, "delta": 0, None: 0}
+    for ts, name in sorted(snapshots):
+        path = os.path.join(snapshot_dir, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            counts[writer.append(json.load(f).get("data", {}), ts)] += 1
+    writer.close()
+    return counts
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "at":
+        found = ArchiveReader(sys.argv[2]).at(datetime.fromisoformat(sys.argv[3]).timestamp())
+        if found is None:
+            print("No snapshot at or before that time")
+        else:
+            print(json.dumps({"time": datetime.fromtimestamp(found[0]).isoformat(), "data": found[1]}, indent=2))
+    elif len(sys.argv) == 4 and sys.argv[1] == "import":
+        counts = import_snapshots(sys.argv[2], sys.argv[3])
+        print(f"Imported {counts['keyframe']} keyframes, {counts['delta']} deltas, skipped {counts[None]} unchanged")
+    else:
+        print("usage: mqtt_archive.py at <archive_dir> <ISO time> | import <snapshot_dir> <archive_dir>")
+        sys.exit(2)
@@ -0,0 +1,257 @@
+"""
+Columnar, memory-mapped history of the MQTT registers.
+
+One directory per local day, each a set of equally long float64 columns:
+
+  <store>/<YYYYMMDD>/_time.f8        epoch of every row, ascending
+  <store>/<YYYYMMDD>/c<n>.f8         one column per register (NaN = absent / not numeric)
+  <store>/<YYYYMMDD>/columns.json    {"rows": committed rows, "columns": {register: file}}
+
+Rows are buffered and appended to every column in blocks (FLUSH_ROWS rows or
+FLUSH_SEC, whichever comes first); columns.json is replaced after the data, so
+readers only ever see committed rows and a writer that died mid-flush is
+trimmed back to the last commit when the day is reopened. A register first
+seen mid-day gets a column backfilled with NaN.
+
+Reads memory-map only the columns asked for, slice them by time with a
+binary search on _time and reduce each bucket with NumPy, so a week of
+per-second data comes back as a few hundred min/max/avg points.
+"""
+import json
+import math
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+
+from segments import write_atomic
+
+try:
+    import fcntl
+except ImportError:            # Windows
+    fcntl = None
+    import msvcrt
+
+FLUSH_ROWS = 60                # rows buffered before they are appended to the columns
+FLUSH_SEC = 5.0                # ... or this long after the first buffered row
+RETENTION_DAYS = 14            # whole days older than this are deleted (0 = keep forever)
+
+# Epochs the day partitions can be named for (datetime's range, with margin for time zones)
+EPOCH_MIN = 0.0
+EPOCH_MAX = datetime(9999, 12, 30).timestamp()
+
+TIME_FILE = "_time.f8"
+META_FILE = "columns.json"
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y%m%d")
+
+
+def _days(directory):
+    try:
+        return sorted(n for n in os.listdir(directory) if n.isdigit() and len(n) == 8)
+    except FileNotFoundError:
+        return []
+
+
+def clamp_range(start, end):
+    """start/end limited to [EPOCH_MIN, EPOCH_MAX]."""
+    return min(max(start, EPOCH_MIN), EPOCH_MAX), min(max(end, EPOCH_MIN), EPOCH_MAX)
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"rows": 0, "columns": {}}
+
+
+def as_number(value):
+    """Float for finite numbers, booleans and numeric strings; NaN for anything else."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return float("nan")
+    return number if math.isfinite(number) else float("nan")
+
+
+def try_lock(path):
+    """Non-blocking exclusive lock on path; the open handle holds it for the process lifetime."""
+    fh = open(path, "a+")
+    try:
+        if fcntl:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return fh
+    except OSError:
+        fh.close()
+        return None
+
+
+class StoreWriter:
+    """Single writer per store directory (see try_lock)."""
+
+    def __init__(self, directory, flush_rows=FLUSH_ROWS, flush_sec=FLUSH_SEC):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_sec = flush_sec
+        self._day = None
+        self._meta = None
+        self._buffer = []          # (ts, data) not yet appended
+        self._buffered_at = 0.0
+        self._last_t = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self, day):
+        """Load a day's columns.json and cut every column back to its committed length."""
+        path = os.path.join(self.directory, day)
+        os.makedirs(path, exist_ok=True)
+        meta = _read_meta(path)
+        for name in [TIME_FILE, *meta["columns"].values()]:
+            file = os.path.join(path, name)
+            if os.path.exists(file) and os.path.getsize(file) != meta["rows"] * 8:
+                with open(file, "r+b") as f:
+                    f.truncate(meta["rows"] * 8)
+        if meta["rows"]:
+            times = np.memmap(os.path.join(path, TIME_FILE), dtype=np.float64, mode="r")
+            self._last_t = max(self._last_t, float(times[-1]))
+            del times
+        self._day, self._meta = day, meta
+
+    def append(self, data, ts=None):
+        """Buffer one snapshot of the register dict; flushes when the buffer is full or old."""
+        ts = max(time.time() if ts is None else ts, self._last_t)
+        self._last_t = ts
+        if not self._buffer:
+            self._buffered_at = time.time()
+        self._buffer.append((ts, data))
+        if len(self._buffer) >= self.flush_rows or time.time() - self._buffered_at >= self.flush_sec:
+            self.flush()
+
+    def maybe_flush(self):
+        """Flush a buffer that has aged out (call periodically)."""
+        if self._buffer and time.time() - self._buffered_at >= self.flush_sec:
+            self.flush()
+
+    def flush(self):
+        rows, self._buffer = self._buffer, []
+        while rows:
+            day = _day(rows[0][0])
+            n = 1
+            while n < len(rows) and _day(rows[n][0]) == day:
+                n += 1
+            self._append_block(day, rows[:n])
+            rows = rows[n:]
+
+    def _append_block(self, day, rows):
+        if day != self._day:
+            self._open(day)
+        path = os.path.join(self.directory, day)
+        meta = self._meta
+        columns = dict(meta["columns"])
+        for _, data in rows:
+            for key in data:
+                if key not in columns:
+                    columns[key] = f"c{len(columns)}.f8"
+                    # Backfill rows from before the register appeared
+                    with open(os.path.join(path, columns[key]), "wb") as f:
+                        np.full(meta["rows"], np.nan).tofile(f)
+
+        with open(os.path.join(path, TIME_FILE), "ab") as f:
+            np.array([ts for ts, _ in rows], dtype=np.float64).tofile(f)
+        for key, name in columns.items():
+            block = np.array([as_number(data.get(key)) for _, data in rows], dtype=np.float64)
+            with open(os.path.join(path, name), "ab") as f:
+                block.tofile(f)
+
+        # Commit: readers (and a restarted writer) trust columns.json, not file sizes
+        self._meta = {"rows": meta["rows"] + len(rows), "columns": columns}
+        write_atomic(os.path.join(path, META_FILE), json.dumps(self._meta).encode(), fsync=False)
+
+    def prune(self, retention_days=RETENTION_DAYS):
+        """Delete whole days older than retention_days. Returns how many."""
+        if not retention_days:
+            return 0
+        cutoff = _day(time.time() - retention_days * 86400)
+        removed = 0
+        for day in _days(self.directory):
+            if day >= cutoff or day == self._day:
+                break
+            try:
+                shutil.rmtree(os.path.join(self.directory, day))
+                removed += 1
+            except OSError:
+                break              # still mapped by a reader (Windows): try again next time
+        return removed
+
+    def close(self):
+        self.flush()
+
+
+def _slice(directory, keys, start, end):
+    """(times, {key: values}) of committed rows with start <= t < end, across days."""
+    times, columns = [], {key: [] for key in keys}
+    for day in _days(directory):
+        if day < _day(start):
+            continue
+        if day > _day(end):
+            break
+        path = os.path.join(directory, day)
+        meta = _read_meta(path)
+        rows = meta["rows"]
+        if not rows:
+            continue
+        t = np.memmap(os.path.join(path, TIME_FILE), dtype=np.float64, mode="r", shape=(rows,))
+        lo, hi = np.searchsorted(t, [start, end])
+        if lo == hi:
+            continue
+        times.append(np.array(t[lo:hi]))
+        for key in keys:
+            name = meta["columns"].get(key)
+            if name is None:
+                columns[key].append(np.full(hi - lo, np.nan))
+            else:
+                col = np.memmap(os.path.join(path, name), dtype=np.float64, mode="r", shape=(rows,))
+                columns[key].append(np.array(col[lo:hi]))
+    if not times:
+        return np.empty(0), {key: np.empty(0) for key in keys}
+    return np.concatenate(times), {key: np.concatenate(parts) for key, parts in columns.items()}
+
+
+def _listed(values, valid):
+    return [v if ok else None for v, ok in zip(values.tolist(), valid.tolist())]
+
+
+def history(directory, keys, start, end, bucket_sec):
+    """
+    Per-bucket min/max/avg of each register over [start, end):
+    {"t": [bucket start epochs], "data": {key: {"min": [...], "max": [...], "avg": [...]}}}.
+    Buckets without rows are omitted; values are None where a register had no number.
+    """
+    start, end = clamp_range(start, end)
+    times, columns = _slice(directory, keys, start, end)
+    if not len(times):
+        return {"t": [], "data": {key: {"min": [], "max": [], "avg": []} for key in keys}}
+
+    bucket = np.floor((times - start) / bucket_sec).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    out = {"t": (start + bucket[starts] * bucket_sec).tolist(), "data": {}}
+    for key, values in columns.items():
+        valid = ~np.isnan(values)
+        counts = np.add.reduceat(valid, starts)
+        has = counts > 0
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = sums / counts
+        out["data"][key] = {
+            "min": _listed(np.fmin.reduceat(values, starts), has),
+            "max": _listed(np.fmax.reduceat(values, starts), has),
+            "avg": _listed(avg, has),
+        }
+    return out
@@ -0,0 +1,128 @@
+"""
+Shared internet-connectivity oracle.
+
+All DNS targets are raced in parallel with non-blocking connects; the first
+one to accept wins, so a check costs at most one timeout. The result is
+published to a small status file with a TTL so every process on the box
+(monitors, streamers, Band_storage) reuses the same answer instead of
+probing the uplink on its own. A lock file makes sure only one process
+re-probes when the answer goes stale.
+"""
+import errno
+import json
+import os
+import selectors
+import socket
+import tempfile
+import time
+
+TARGETS = [
+    ("1.1.1.1", 53),          # Cloudflare DNS (may be blocked in China)
+    ("114.114.114.114", 53),  # China DNS (China-friendly)
+    ("8.8.8.8", 53),          # Google DNS (may be blocked)
+    ("223.5.5.5", 53),        # Alibaba DNS (China-friendly)
+]
+PROBE_TIMEOUT_SEC = 2.0       # tolerate ~1–2 s RTT
+TTL_SEC = float(os.getenv("NETCHECK_TTL_SEC", "5"))
+STATUS_FILE = os.getenv("NETCHECK_STATUS_FILE", os.path.join(tempfile.gettempdir(), "vessel604_netstatus.json"))
+LOCK_FILE = STATUS_FILE + ".lock"
+
+
+def probe(targets=TARGETS, timeout=PROBE_TIMEOUT_SEC):
+    """Connect to every target at once; True as soon as any accepts. Sockets are always closed."""
+    sel = selectors.DefaultSelector()
+    socks = []
+    try:
+        for host, port in targets:
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.setblocking(False)
+            socks.append(s)
+            rc = s.connect_ex((host, port))
+            if rc == 0:
+                return True
+            if rc in (errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, "WSAEWOULDBLOCK", -1)):
+                sel.register(s, selectors.EVENT_WRITE)
+
+        deadline = time.monotonic() + timeout
+        while sel.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in sel.select(remaining):
+                s = key.fileobj
+                sel.unregister(s)
+                if s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    return True
+        return False
+    finally:
+        sel.close()
+        for s in socks:
+            s.close()
+
+
+def read_status():
+    """Last published {"ok": bool, "checked_at": epoch}, or None."""
+    try:
+        with open(STATUS_FILE) as f:
+            status = json.load(f)
+        return {"ok": bool(status["ok"]), "checked_at": float(status["checked_at"])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _publish(ok):
+    """
+    Share a fresh result. Returns it even if the status file cannot be written
+    (on Windows os.replace fails while another process has the file open).
+    """
+    status = {"ok": ok, "checked_at": time.time()}
+    tmp = f"{STATUS_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(status, f)
+        os.replace(tmp, STATUS_FILE)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    return status
+
+
+def _try_lock(timeout):
+    try:
+        os.close(os.open(LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        # A prober that died mid-check must not block everyone forever
+        try:
+            if time.time() - os.path.getmtime(LOCK_FILE) > 2 * timeout + 1:
+                os.remove(LOCK_FILE)
+        except OSError:
+            pass
+        return False
+
+
+def is_online(max_age=TTL_SEC, timeout=PROBE_TIMEOUT_SEC):
+    """Cached answer if younger than max_age, otherwise probe (one process at a time)."""
+    status = read_status()
+    if status and time.time() - status["checked_at"] < max_age:
+        return status["ok"]
+
+    try:
+        locked = _try_lock(timeout)
+    except OSError:
+        # Lock file unusable (permissions, read-only temp dir): probe without coordinating
+        return _publish(probe(timeout=timeout))["ok"]
+    if not locked:
+        # Someone else is probing right now; their answer lands within one timeout
+        if status:
+            return status["ok"]
+        return probe(timeout=timeout)
+    try:
+        return _publish(probe(timeout=timeout))["ok"]
+    finally:
+        try:
+            os.remove(LOCK_FILE)
+        except OSError:
+            pass
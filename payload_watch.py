@@ -0,0 +1,161 @@
+"""
+Event-driven watcher for NDCTELE payload directories.
+
+The directory is scanned once at startup to seed an in-memory priority queue
+ordered by the timestamp in the filename. After that, new files arrive through
+inotify (IN_CLOSE_WRITE / IN_MOVED_TO) on Linux; elsewhere, or if inotify is
+unavailable, the directory is polled instead.
+
+Files handed out by get_batch stay claimed until the consumer calls release
+(handled) or requeue (failed): rescans and events skip claimed files, so a
+file is never in two batches at once.
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import heapq
+import os
+import re
+import struct
+
+POLL_INTERVAL_SEC = 5.0            # fallback polling period
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+class PayloadWatcher:
+    def __init__(self, directory, prefix="NDCTELE_", suffix=".json", poll_interval=POLL_INTERVAL_SEC):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.mode = None
+        self._pattern = re.compile(rf"^{re.escape(prefix)}(\d{{14}}){re.escape(suffix)}$")
+        self._heap = []          # (timestamp, filename)
+        self._members = set()    # filenames currently queued (heap entries not in here are stale)
+        self._claimed = set()    # filenames handed out by get_batch and not yet released
+        self._changed = None
+        self._fd = None
+
+    def __len__(self):
+        return len(self._members)
+
+    # ---- queue ----
+    def _add(self, name):
+        m = self._pattern.match(name)
+        if not m or name in self._members or name in self._claimed:
+            return
+        self._members.add(name)
+        heapq.heappush(self._heap, (m.group(1), name))
+        if self._changed:
+            self._changed.set()
+
+    def _discard(self, name):
+        self._members.discard(name)
+
+    def rescan(self):
+        """Rebuild the queue from the directory (startup, inotify overflow, polling)."""
+        present = {e.name for e in os.scandir(self.directory) if e.is_file() and self._pattern.match(e.name)}
+        for name in self._members - present:
+            self._discard(name)
+        for name in present - self._members - self._claimed:
+            self._add(name)
+
+    def release(self, names):
+        """Files from get_batch that were handled (deleted or moved away)."""
+        self._claimed.difference_update(names)
+
+    def requeue(self, names):
+        """Put back files that could not be handled; they keep their timestamp order."""
+        self.release(names)
+        for name in names:
+            if os.path.exists(os.path.join(self.directory, name)):
+                self._add(name)
+
+    async def get_batch(self, max_items):
+        """Wait for at least one file, then pop and claim up to max_items oldest-first."""
+        while not self._members:
+            self._changed.clear()
+            await self._changed.wait()
+        batch = []
+        while self._heap and len(batch) < max_items:
+            _ts, name = heapq.heappop(self._heap)
+            if name in self._members:
+                self._members.discard(name)
+                self._claimed.add(name)
+                batch.append(name)
+        return batch
+
+    # ---- sources ----
+    async def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._changed = asyncio.Event()
+        self.rescan()
+        if self._start_inotify():
+            self.mode = "inotify"
+        else:
+            self.mode = "polling"
+            asyncio.get_running_loop().create_task(self._poll())
+
+    def _start_inotify(self):
+        libc = _load_libc()
+        if libc is None:
+            return False
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory), mask) < 0:
+            os.close(fd)
+            return False
+        self._fd = fd
+        asyncio.get_running_loop().add_reader(fd, self._on_inotify)
+        # Anything written between the scan and the watch being armed
+        self.rescan()
+        return True
+
+    def _on_inotify(self):
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            _wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+            name = buf[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0").decode(errors="replace")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.rescan()
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._add(name)
+            elif mask & (IN_MOVED_FROM | IN_DELETE):
+                self._discard(name)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                self.rescan()
+            except OSError as e:
+                print(f"⚠️ Polling {self.directory} failed: {e}")
+
+    def close(self):
+        if self._fd is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Shared in-process probe engine.
+
+One asyncio loop, running in a daemon thread, drives echo probes for every
+monitored host. ICMP echo goes out over a single unprivileged datagram socket
+(Linux ``ping_group_range`` / macOS); where that is not permitted (Windows,
+locked-down kernels) each echo falls back to a TCP connect to a few common
+ports. No ``ping`` subprocesses.
+"""
+import asyncio, itertools, os, socket, struct, threading, time
+from dataclasses import dataclass, field
+
+# ========= Tunables =========
+ECHO_COUNT = 2                     # echoes per probe
+ECHO_TIMEOUT_SEC = 0.6             # per-echo timeout
+ECHO_INTERVAL_SEC = 0.05           # spacing between echoes of one probe
+MAX_IN_FLIGHT = 512                # concurrent host probes on the loop
+ENGINE_START_TIMEOUT_SEC = 10.0    # get_engine() raises if the loop is not up by then
+TCP_FALLBACK_PORTS = tuple(
+    int(p) for p in os.getenv("PROBE_TCP_PORTS", "80,443,22").split(",") if p.strip()
+)
+# A refused connect only proves the host is up if the RST came from the host itself; a
+# firewall REJECT on the path looks the same, so by default only an accepted connect counts.
+# Hosts with none of the default ports open get their own settings (see configure_host).
+TCP_REFUSED_IS_ALIVE = os.getenv("PROBE_TCP_REFUSED_IS_ALIVE", "0") == "1"
+ICMP_PAYLOAD = b"vessel-604-probe"
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+@dataclass
+class ProbeResult:
+    ip: str
+    method: str                                   # "icmp" or "tcp"
+    rtts_ms: list = field(default_factory=list)   # one entry per echo, None = lost
+
+    @property
+    def sent(self):
+        return len(self.rtts_ms)
+
+    @property
+    def received(self):
+        return sum(1 for r in self.rtts_ms if r is not None)
+
+    @property
+    def loss(self):
+        return 1.0 - (self.received / self.sent) if self.sent else 1.0
+
+    @property
+    def avg_rtt_ms(self):
+        got = [r for r in self.rtts_ms if r is not None]
+        return round(sum(got) / len(got), 2) if got else None
+
+    @property
+    def up(self):
+        # Same rule the old "Reply from" parsing used: a majority of echoes answered
+        return self.sent > 0 and self.received >= (self.sent // 2 + 1)
+
+
+# ========= ICMP =========
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_packet(seq: int) -> bytes:
+    # The kernel rewrites the identifier with the socket's port for ping sockets
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, 0, seq)
+    csum = _checksum(header + ICMP_PAYLOAD)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, 0, seq) + ICMP_PAYLOAD
+
+
+class _IcmpSocket:
+    """One datagram ICMP socket shared by every probe; replies matched by (ip, seq)."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        self._seq = itertools.count(1)
+        self._pending = {}  # (ip, seq) -> (future, t0)
+        try:
+            self._sock.setblocking(False)
+            # NotImplementedError on loops without add_reader (Windows Proactor)
+            loop.add_reader(self._sock.fileno(), self._on_readable)
+        except BaseException:
+            self._sock.close()
+            raise
+
+    def close(self):
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+
+    def _next_seq(self, ip):
+        while True:
+            seq = next(self._seq) & 0xFFFF
+            if seq and (ip, seq) not in self._pending:
+                return seq
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, addr = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            t1 = time.monotonic()
+            # Linux hands back the bare ICMP message, BSD/macOS prepend the IP header
+            if data and (data[0] >> 4) == 4:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8:
+                continue
+            icmp_type, _code, _csum, _ident, seq = struct.unpack("!BBHHH", data[:8])
+            if icmp_type != ICMP_ECHO_REPLY:
+                continue
+            entry = self._pending.get((addr[0], seq))
+            if entry and not entry[0].done():
+                entry[0].set_result((t1 - entry[1]) * 1000.0)
+
+    async def echo(self, ip, timeout):
+        seq = self._next_seq(ip)
+        fut = self._loop.create_future()
+        key = (ip, seq)
+        self._pending[key] = (fut, time.monotonic())
+        try:
+            try:
+                self._sock.sendto(_echo_packet(seq), (ip, 0))
+            except OSError:
+                return None
+            return round(await asyncio.wait_for(fut, timeout), 2)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending.pop(key, None)
+
+
+# ========= TCP fallback =========
+_tcp_hosts = {}                    # ip -> (ports, refused_is_alive) overriding the defaults
+
+
+def configure_host(ip, tcp_ports=None, tcp_refused_is_alive=None):
+    """Per-host TCP fallback settings; None keeps the default for that setting."""
+    ports = tuple(int(p) for p in tcp_ports) if tcp_ports else TCP_FALLBACK_PORTS
+    refused = TCP_REFUSED_IS_ALIVE if tcp_refused_is_alive is None else bool(tcp_refused_is_alive)
+    _tcp_hosts[ip] = (ports, refused)
+
+
+async def _tcp_echo(ip, timeout):
+    """Race a connect to each fallback port; the first accepted (or, if enabled, refused) one wins."""
+    loop = asyncio.get_running_loop()
+    ports, refused_is_alive = _tcp_hosts.get(ip, (TCP_FALLBACK_PORTS, TCP_REFUSED_IS_ALIVE))
+
+    async def attempt(port):
+        t0 = time.monotonic()
+        try:
+            _r, w = await asyncio.open_connection(ip, port)
+            w.close()
+        except ConnectionRefusedError:
+            if not refused_is_alive:
+                raise
+        return (time.monotonic() - t0) * 1000.0
+
+    tasks = [loop.create_task(attempt(p)) for p in ports]
+    deadline = loop.time() + timeout
+    try:
+        while tasks:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            done, pending = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if not t.cancelled() and t.exception() is None:
+                    return round(t.result(), 2)
+            tasks = list(pending)
+        return None
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+# ========= Engine =========
+class ProbeEngine:
+    def __init__(self):
+        self._loop = None
+        self._icmp = None
+        self._sem = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="probe-engine", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(ENGINE_START_TIMEOUT_SEC) or self._loop is None:
+            raise RuntimeError("probe engine failed to start")
+
+    @property
+    def loop(self):
+        return self._loop
+
+    @property
+    def method(self):
+        return "icmp" if self._icmp else "tcp"
+
+    def _run(self):
+        try:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._sem = asyncio.Semaphore(MAX_IN_FLIGHT)
+            try:
+                self._icmp = _IcmpSocket(loop)
+            except Exception:
+                # No permission for ping sockets, or a loop without add_reader: TCP connect only
+                self._icmp = None
+            self._loop = loop
+        finally:
+            # Never leave __init__ (and everyone behind _engine_lock) waiting
+            self._ready.set()
+        loop.run_forever()
+
+    async def aprobe(self, ip, count=ECHO_COUNT, timeout=ECHO_TIMEOUT_SEC):
+        """Probe one host from inside the engine loop."""
+        async with self._sem:
+            echo = self._icmp.echo if self._icmp else _tcp_echo
+
+            async def one(i):
+                if i:
+                    await asyncio.sleep(i * ECHO_INTERVAL_SEC)
+                try:
+                    return await echo(ip, timeout)
+                except Exception:
+                    return None
+
+            rtts = await asyncio.gather(*(one(i) for i in range(count)))
+            return ProbeResult(ip=ip, method=self.method, rtts_ms=list(rtts))
+
+    async def aprobe_many(self, ips, count=ECHO_COUNT, timeout=ECHO_TIMEOUT_SEC):
+        results = await asyncio.gather(*(self.aprobe(ip, count, timeout) for ip in ips))
+        return {r.ip: r for r in results}
+
+    def probe_many(self, ips, count=ECHO_COUNT, timeout=ECHO_TIMEOUT_SEC):
+        """Blocking helper for threads: probe all hosts concurrently, dict ip -> ProbeResult."""
+        ips = list(dict.fromkeys(ips))
+        fut = asyncio.run_coroutine_threadsafe(self.aprobe_many(ips, count, timeout), self._loop)
+        try:
+            return fut.result(probe_deadline(len(ips), count, timeout))
+        except Exception:
+            fut.cancel()
+            return {ip: ProbeResult(ip=ip, method=self.method, rtts_ms=[None] * count) for ip in ips}
+
+    def probe(self, ip, count=ECHO_COUNT, timeout=ECHO_TIMEOUT_SEC):
+        return self.probe_many([ip], count, timeout)[ip]
+
+
+def probe_deadline(hosts, count=ECHO_COUNT, timeout=ECHO_TIMEOUT_SEC):
+    """Longest probe_many() blocks for this many hosts before giving up."""
+    return timeout + count * ECHO_INTERVAL_SEC + 2.0 + hosts / MAX_IN_FLIGHT * timeout
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide engine, started on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ProbeEngine()
+        return _engine
+
+
+def probe_many(ips, count=ECHO_COUNT, timeout=ECHO_TIMEOUT_SEC):
+    return get_engine().probe_many(ips, count, timeout)
+
+
+def ping_ok(ip, count=ECHO_COUNT, timeout=ECHO_TIMEOUT_SEC):
+    return get_engine().probe(ip, count, timeout).up
@@ -0,0 +1,152 @@
+"""
+Atomic payload files and rotating NDJSON segments for the file handoff.
+
+Nothing appears in the payload directory under its final name until it is
+complete: single files are written to a hidden temp file and renamed into
+place, and segments are appended to a hidden ".part" file that is renamed to
+
+  NDCSEG_<timestamp of first record>.ndjson    one compact JSON record per line
+
+once it holds SEGMENT_MAX_RECORDS records or is SEGMENT_MAX_AGE_SEC old. The
+rename is what the streamers' watchers react to, so they never see a partial
+file. A writer that crashes leaves a .part behind; the next writer drops its
+torn last line (if any) and publishes the rest.
+"""
+import json
+import os
+import time
+
+SEGMENT_PREFIX = "NDCSEG_"
+SEGMENT_SUFFIX = ".ndjson"
+PART_SUFFIX = ".part"
+SEGMENT_MAX_RECORDS = 60                  # roll after this many records
+SEGMENT_MAX_AGE_SEC = 3600.0              # ... or when the oldest record is this old (60 x one record a minute)
+FSYNC_EVERY = 1                           # fsync after this many records (0 = leave it to the OS)
+
+
+def encode(record):
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+def _fsync_dir(directory):
+    """Make a rename durable (no-op where directories cannot be opened, e.g. Windows)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, data, fsync=True):
+    """Write data to a hidden temp file beside path, then rename it into place."""
+    directory, name = os.path.split(path)
+    tmp = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if fsync:
+        _fsync_dir(directory or ".")
+
+
+def segment_name(timestamp):
+    return f"{SEGMENT_PREFIX}{timestamp}{SEGMENT_SUFFIX}"
+
+
+def read_segment(path):
+    """Records of a published segment, in write order."""
+    records = []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+
+
+class SegmentWriter:
+    def __init__(self, directory, max_records=SEGMENT_MAX_RECORDS, max_age_sec=SEGMENT_MAX_AGE_SEC,
+                 fsync_every=FSYNC_EVERY):
+        self.directory = directory
+        self.max_records = max_records
+        self.max_age_sec = max_age_sec
+        self.fsync_every = fsync_every
+        self._fh = None
+        self._part = None
+        self._final = None
+        self._count = 0
+        self._opened = 0.0
+        self._unsynced = 0
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        """Publish .part files left by a writer that died, minus a torn last line."""
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith("." + SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX + PART_SUFFIX)):
+                continue
+            part = os.path.join(self.directory, name)
+            with open(part, "r+b") as f:
+                data = f.read()
+                good = data.rfind(b"\n") + 1
+                f.truncate(good)
+                f.flush()
+                os.fsync(f.fileno())
+            if good:
+                self._publish(part, os.path.join(self.directory, name[1:-len(PART_SUFFIX)]))
+                print(f"Recovered segment {name[1:-len(PART_SUFFIX)]}")
+            else:
+                os.remove(part)
+
+    def _publish(self, part, final):
+        os.replace(part, final)
+        _fsync_dir(self.directory)
+
+    def append(self, record, timestamp):
+        """Append one record; timestamp (14 digits) names the segment when it opens one."""
+        if self._fh and time.time() - self._opened >= self.max_age_sec:
+            self.rotate()
+        if self._fh is None:
+            self._final = os.path.join(self.directory, segment_name(timestamp))
+            self._part = os.path.join(self.directory, "." + segment_name(timestamp) + PART_SUFFIX)
+            self._fh = open(self._part, "ab")
+            self._opened = time.time()
+            self._count = 0
+        self._fh.write(encode(record))
+        self._fh.flush()
+        self._count += 1
+        self._unsynced += 1
+        if self.fsync_every and self._unsynced >= self.fsync_every:
+            self.sync()
+        if self._count >= self.max_records:
+            self.rotate()
+
+    def sync(self):
+        if self._fh and self._unsynced:
+            os.fsync(self._fh.fileno())
+            self._unsynced = 0
+
+    def maybe_rotate(self):
+        """Publish the open segment if it has aged out (call periodically)."""
+        if self._fh and time.time() - self._opened >= self.max_age_sec:
+            self.rotate()
+
+    def rotate(self):
+        """Publish the open segment (complete and fsynced) under its final name."""
+        if self._fh is None:
+            return
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._fh.close()
+        self._publish(self._part, self._final)
+        self._fh = None
+        self._unsynced = 0
+
+    def close(self):
+        self.rotate()
@@ -0,0 +1,291 @@
+"""
+Append-only, crash-safe spool for telemetry records.
+
+A topic is a directory of segments:
+
+  <base>.log     records framed as [length][crc32][compact JSON], base = offset of its first record
+  <base>.idx     one 8-byte file position per record of the matching .log
+  <name>.ckpt    next offset consumer <name> has not acknowledged yet
+
+One process appends (SpoolWriter); any number of processes read with their own
+checkpoint (SpoolReader). Nothing is moved or deleted while in use: a crash
+leaves at most a torn record at the tail, which the writer truncates on open and
+readers never see (its CRC does not match). Delivery is at-least-once — a
+consumer that dies before committing re-reads from its last checkpoint.
+"""
+import asyncio
+import json
+import os
+import struct
+import zlib
+
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024   # roll to a new segment after this many bytes
+FSYNC_EVERY = 1                       # fsync after this many appends (0 = leave it to the OS)
+POLL_INTERVAL_SEC = 0.5               # reader wait granularity
+
+_FRAME = struct.Struct("!II")         # payload length, crc32
+_POS = struct.Struct("!Q")
+
+
+def _segment_bases(directory):
+    return sorted(int(n[:-4]) for n in os.listdir(directory) if n.endswith(".log") and n[:-4].isdigit())
+
+
+def _log_path(directory, base):
+    return os.path.join(directory, f"{base:020d}.log")
+
+
+def _idx_path(directory, base):
+    return os.path.join(directory, f"{base:020d}.idx")
+
+
+def _read_frame(f):
+    """Next record at the file position, or None if the tail is incomplete/torn."""
+    header = f.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        return None
+    length, crc = _FRAME.unpack(header)
+    data = f.read(length)
+    if len(data) < length or zlib.crc32(data) != crc:
+        return None
+    return data
+
+
+def _fsync_replace(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _checkpoints(directory):
+    out = {}
+    for name in os.listdir(directory):
+        if name.endswith(".ckpt"):
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    out[name[:-5]] = int(json.load(f)["offset"])
+            except (OSError, ValueError, KeyError):
+                continue
+    return out
+
+
+class SpoolWriter:
+    def __init__(self, directory, fsync_every=FSYNC_EVERY, segment_max_bytes=SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.fsync_every = fsync_every
+        self.segment_max_bytes = segment_max_bytes
+        self._unsynced = 0
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        """Reopen the active segment, dropping a torn tail and rebuilding its index."""
+        bases = _segment_bases(self.directory)
+        base = bases[-1] if bases else 0
+        positions = []
+        good = 0
+        if os.path.exists(_log_path(self.directory, base)):
+            with open(_log_path(self.directory, base), "rb") as f:
+                while True:
+                    data = _read_frame(f)
+                    if data is None:
+                        break
+                    positions.append(good)
+                    good += _FRAME.size + len(data)
+            with open(_log_path(self.directory, base), "r+b") as f:
+                f.truncate(good)
+                os.fsync(f.fileno())
+        _fsync_replace(_idx_path(self.directory, base), b"".join(_POS.pack(p) for p in positions))
+        self._open(base, good, len(positions))
+
+    def _open(self, base, size, count):
+        self._base = base
+        self._size = size
+        self._next = base + count
+        self._log = open(_log_path(self.directory, base), "ab")
+        self._idx = open(_idx_path(self.directory, base), "ab")
+
+    def _roll(self):
+        self.sync()
+        self._log.close()
+        self._idx.close()
+        self._open(self._next, 0, 0)
+
+    @property
+    def next_offset(self):
+        return self._next
+
+    def append_many(self, records):
+        """Append records in order; returns their offsets. One fsync per batch at most."""
+        offsets = []
+        for record in records:
+            data = json.dumps(record, separators=(",", ":")).encode()
+            frame = _FRAME.pack(len(data), zlib.crc32(data)) + data
+            if self._size and self._size + len(frame) > self.segment_max_bytes:
+                self._roll()
+            # Data before index: a crash can only leave the index short, never pointing past data
+            self._log.write(frame)
+            self._log.flush()
+            self._idx.write(_POS.pack(self._size))
+            self._size += len(frame)
+            offsets.append(self._next)
+            self._next += 1
+            self._unsynced += 1
+        self._idx.flush()
+        if self.fsync_every and self._unsynced >= self.fsync_every:
+            self.sync()
+        return offsets
+
+    def append(self, record):
+        return self.append_many([record])[0]
+
+    def sync(self):
+        if self._unsynced:
+            os.fsync(self._log.fileno())
+            os.fsync(self._idx.fileno())
+            self._unsynced = 0
+
+    def prune(self):
+        """
+        Delete segments every known consumer has fully acknowledged. Returns how many.
+        A segment that cannot be deleted yet (Windows: a reader still has it open)
+        is skipped and tried again on the next prune.
+        """
+        acked = _checkpoints(self.directory)
+        if not acked:
+            return 0
+        low = min(acked.values())
+        bases = _segment_bases(self.directory)
+        removed = 0
+        for base, next_base in zip(bases, bases[1:]):
+            if next_base > low or base == self._base:
+                break
+            # Index first: the .log is what marks a segment as present, so it goes last
+            try:
+                if os.path.exists(_idx_path(self.directory, base)):
+                    os.remove(_idx_path(self.directory, base))
+                os.remove(_log_path(self.directory, base))
+            except OSError:
+                continue
+            removed += 1
+        return removed
+
+    def close(self):
+        self.sync()
+        self._log.close()
+        self._idx.close()
+
+
+class SpoolReader:
+    def __init__(self, directory, consumer):
+        self.directory = directory
+        self.consumer = consumer
+        self._ckpt_path = os.path.join(directory, f"{consumer}.ckpt")
+        self._fh = None
+        os.makedirs(directory, exist_ok=True)
+        self.committed = self._load_checkpoint()
+        self._seek(self.committed)
+
+    def _load_checkpoint(self):
+        try:
+            with open(self._ckpt_path) as f:
+                return int(json.load(f)["offset"])
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def _seek(self, offset):
+        """Position the reader at a record offset (or the oldest one still spooled)."""
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+        bases = _segment_bases(self.directory)
+        self._next = offset
+        if not bases:
+            return
+        if offset < bases[0]:
+            offset = self._next = bases[0]
+        base = max(b for b in bases if b <= offset)
+        self._base = base
+        self._fh = open(_log_path(self.directory, base), "rb")
+        # Jump via the index as far as it reaches, then walk the remaining frames
+        rel = offset - base
+        k, pos = 0, 0
+        try:
+            with open(_idx_path(self.directory, base), "rb") as idx:
+                entries = os.fstat(idx.fileno()).st_size // _POS.size
+                if entries:
+                    k = min(rel, entries - 1)
+                    idx.seek(k * _POS.size)
+                    pos = _POS.unpack(idx.read(_POS.size))[0]
+        except OSError:
+            k, pos = 0, 0
+        self._fh.seek(pos)
+        while k < rel:
+            start = self._fh.tell()
+            if _read_frame(self._fh) is None:
+                self._fh.seek(start)
+                break
+            k += 1
+        self._next = base + k
+
+    def _advance_segment(self):
+        bases = [b for b in _segment_bases(self.directory) if b > getattr(self, "_base", -1)]
+        if bases and bases[0] <= self._next:
+            self._seek(self._next)
+            return True
+        return False
+
+    def read(self, max_records):
+        """Up to max_records (offset, record) pairs past the last read; does not commit."""
+        out = []
+        if self._fh is None:
+            self._seek(self._next)
+            if self._fh is None:
+                return out
+        while len(out) < max_records:
+            start = self._fh.tell()
+            data = _read_frame(self._fh)
+            if data is None:
+                self._fh.seek(start)
+                if self._advance_segment():
+                    continue
+                break
+            out.append((self._next, json.loads(data)))
+            self._next += 1
+        return out
+
+    def rewind(self):
+        """Go back to the last committed offset (after a failed delivery)."""
+        self._seek(self.committed)
+
+    def commit(self, next_offset):
+        """Acknowledge every record below next_offset."""
+        _fsync_replace(self._ckpt_path, json.dumps({"offset": next_offset}).encode())
+        self.committed = next_offset
+
+    async def wait(self, max_records, poll_interval=POLL_INTERVAL_SEC):
+        """Block (asynchronously) until at least one record is available, then read."""
+        while True:
+            records = self.read(max_records)
+            if records:
+                return records
+            await asyncio.sleep(poll_interval)
+
+    @property
+    def lag(self):
+        bases = _segment_bases(self.directory)
+        if not bases:
+            return 0
+        try:
+            size = os.path.getsize(_idx_path(self.directory, bases[-1]))
+        except OSError:
+            return 0
+        return max(0, bases[-1] + size // _POS.size - self.committed)
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,67 @@
+import importlib
+import queue
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    global db
+    # db.py creates its database in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    db = importlib.import_module("db")
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "test.db"))
+    monkeypatch.setattr(db, "_pool", queue.LifoQueue(maxsize=db.POOL_SIZE))
+    db.init_db()
+    # Five rows per second so pages split inside runs of equal CreatedOn
+    with db.db_conn() as conn:
+        for i in range(40):
+            created = (datetime(2026, 1, 1) + timedelta(seconds=i // 5)).isoformat()
+            conn.execute(db.INSERT_SQL, (created, None, f"f{i}", "Processed" if i % 2 else "Not Processed"))
+    return db.app.test_client()
+
+
+def walk(client, query):
+    ids, cursor = [], None
+    while True:
+        resp = client.get(f"/api/table/page?{query}" + (f"&cursor={cursor}" if cursor else ""))
+        assert resp.status_code == 200
+        ids += [row["ID"] for row in resp.json["data"]]
+        cursor = resp.json["next_cursor"]
+        if not cursor:
+            return ids
+
+
+def test_pages_cover_every_row_once_in_order(client):
+    assert walk(client, "limit=7&order=asc") == list(range(1, 41))
+    assert walk(client, "limit=7") == list(range(40, 0, -1))
+
+
+def test_filters_apply_across_pages(client):
+    assert walk(client, "limit=3&order=asc&status=Processed") == list(range(2, 41, 2))
+    # Rows 11-15 share 00:00:02, rows 26-30 share 00:00:05; until is exclusive
+    ids = walk(client, "limit=4&order=asc&since=2026-01-01T00:00:02&until=2026-01-01T00:00:05")
+    assert ids == list(range(11, 26))
+
+
+def test_new_rows_do_not_shift_a_walk(client):
+    first = client.get("/api/table/page?limit=10").json
+    with db.db_conn() as conn:
+        conn.execute(db.INSERT_SQL, ("2026-01-02T00:00:00", None, "late", "Processed"))
+    second = client.get(f"/api/table/page?limit=10&cursor={first['next_cursor']}").json
+    assert [r["ID"] for r in second["data"]] == list(range(30, 20, -1))
+
+
+def test_offset_aware_since_is_read_as_local_time(client):
+    local = datetime(2026, 1, 1, 0, 0, 7).astimezone()
+    since = local.astimezone(timezone.utc).isoformat()
+    ids = walk(client, f"order=asc&since={since.replace('+', '%2B')}")
+    assert ids == list(range(36, 41))
+
+
+@pytest.mark.parametrize("query", ["cursor=not-base64!", "cursor=Zm9v", "limit=x", "since=yesterday", "order=up"])
+def test_bad_parameters_are_400(client, query):
+    resp = client.get(f"/api/table/page?{query}")
+    assert resp.status_code == 400
+    assert resp.json["success"] is False
@@ -0,0 +1,78 @@
+import os
+from datetime import datetime
+
+import mqtt_archive
+from mqtt_archive import ArchiveReader, ArchiveWriter
+
+T0 = datetime(2026, 1, 1, 8, 0, 0).timestamp()
+
+
+def snapshot(i):
+    data = {"speed": i, "heading": 90, f"extra{i % 3}": i}
+    if i % 4 == 0:
+        data.pop("heading")
+    return data
+
+
+def test_replay_matches_every_snapshot(tmp_path):
+    writer = ArchiveWriter(tmp_path, keyframe_every=4)
+    kinds = [writer.append(snapshot(i), T0 + i * 60) for i in range(10)]
+    writer.close()
+    assert kinds[0] == "keyframe" and kinds[4] == "keyframe" and kinds[1] == "delta"
+
+    reader = ArchiveReader(tmp_path)
+    for i in range(10):
+        assert reader.at(T0 + i * 60 + 30) == (T0 + i * 60, snapshot(i))
+    assert list(reader.iter_range(T0 + 5 * 60, T0 + 8 * 60)) == [(T0 + i * 60, snapshot(i)) for i in (5, 6, 7)]
+    assert reader.at(T0 - 1) is None
+
+
+def test_unchanged_snapshot_is_not_stored(tmp_path):
+    writer = ArchiveWriter(tmp_path)
+    assert writer.append({"a": 1}, T0) == "keyframe"
+    assert writer.append({"a": 1}, T0 + 60) is None
+    assert writer.append({"a": 2}, T0 + 120) == "delta"
+    writer.close()
+    reader = ArchiveReader(tmp_path)
+    assert reader.at(T0 + 90) == (T0, {"a": 1})
+    assert [t for t, _ in reader.iter_range(T0, T0 + 3600)] == [T0, T0 + 120]
+
+
+def test_torn_tail_is_cut_and_index_rebuilt(tmp_path):
+    writer = ArchiveWriter(tmp_path)
+    for i in range(3):
+        writer.append(snapshot(i), T0 + i * 60)
+    writer.close()
+    log, idx = mqtt_archive._paths(tmp_path, mqtt_archive._day(T0))
+    good = os.path.getsize(log)
+    with open(log, "ab") as f:
+        f.write(b"\x00\x00\x01\x00garbage")            # crash mid-frame
+    os.truncate(idx, 0)                                 # ... before the index was written
+
+    writer = ArchiveWriter(tmp_path)
+    assert writer.append(snapshot(3), T0 + 180) == "keyframe"   # a restart always starts with one
+    writer.close()
+    assert os.path.getsize(log) > good
+
+    reader = ArchiveReader(tmp_path)
+    assert [(t, d) for t, d in reader.iter_range(T0, T0 + 3600)] == [(T0 + i * 60, snapshot(i)) for i in range(4)]
+
+
+def test_frames_never_go_back_in_time(tmp_path):
+    writer = ArchiveWriter(tmp_path)
+    writer.append({"a": 1}, T0 + 60)
+    writer.append({"a": 2}, T0)                         # clock stepped back
+    writer.close()
+    assert ArchiveReader(tmp_path).at(T0 + 60) == (T0 + 60, {"a": 2})
+
+
+def test_days_are_replayed_across_midnight(tmp_path):
+    midnight = datetime(2026, 1, 2).timestamp()
+    writer = ArchiveWriter(tmp_path)
+    writer.append({"a": 1}, midnight - 60)
+    writer.append({"a": 2}, midnight + 60)
+    writer.close()
+    reader = ArchiveReader(tmp_path)
+    assert len(mqtt_archive._days(tmp_path)) == 2
+    assert reader.at(midnight) == (midnight - 60, {"a": 1})
+    assert list(reader.iter_range(midnight - 120, midnight + 120)) == [(midnight - 60, {"a": 1}), (midnight + 60, {"a": 2})]
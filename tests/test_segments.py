@@ -0,0 +1,115 @@
+import asyncio
+import os
+
+import pytest
+
+import data_striming
+from segments import SegmentWriter, encode, read_segment, segment_name
+
+
+def record(i):
+    return {"FileName": f"NDCTELE_2026010100{i:04d}.json", "n": i}
+
+
+def test_segment_published_only_when_complete(tmp_path):
+    writer = SegmentWriter(tmp_path, max_records=3, fsync_every=0)
+    for i in range(2):
+        writer.append(record(i), "20260101000000")
+    assert not os.path.exists(tmp_path / segment_name("20260101000000"))
+
+    writer.append(record(2), "20260101000000")
+    assert read_segment(tmp_path / segment_name("20260101000000")) == [record(i) for i in range(3)]
+
+
+def test_crashed_part_is_recovered_without_torn_line(tmp_path):
+    part = tmp_path / ("." + segment_name("20260101000000") + ".part")
+    part.write_bytes(encode(record(0)) + encode(record(1)) + b'{"FileName": "NDCTE')
+
+    SegmentWriter(tmp_path)
+    assert not part.exists()
+    assert read_segment(tmp_path / segment_name("20260101000000")) == [record(0), record(1)]
+
+
+def test_empty_part_is_dropped(tmp_path):
+    part = tmp_path / ("." + segment_name("20260101000000") + ".part")
+    part.write_bytes(b'{"torn')
+    SegmentWriter(tmp_path)
+    assert os.listdir(tmp_path) == []
+
+
+class FakeTransport:
+    """Accepts every record, optionally failing one call; stops the run once all are in."""
+
+    def __init__(self, total, fail_call=None):
+        self.total = total
+        self.fail_call = fail_call
+        self.calls = 0
+        self.accepted = []
+        self.finished = asyncio.Event()
+
+    async def post(self, url, payload):
+        self.calls += 1
+        if self.calls == self.fail_call:
+            raise RuntimeError("connection reset")
+        records = payload["records"]
+        self.accepted += [r["FileName"] for r in records]
+        if len(self.accepted) >= self.total:
+            self.finished.set()
+        return 200, {"results": [{"index": i, "success": True} for i in range(len(records))]}
+
+    def close(self):
+        pass
+
+
+def deliver(tmp_path, monkeypatch, transport):
+    monkeypatch.setattr(data_striming, "PAYLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(data_striming, "FAILED_DIR", str(tmp_path / "failed"))
+    monkeypatch.setattr(data_striming, "BATCH_SIZE", 2)
+    monkeypatch.setattr(data_striming, "RETRY_DELAY_SEC", 0)
+    monkeypatch.setattr(data_striming, "check_internet", lambda: True)
+    monkeypatch.setattr(data_striming, "AsyncTransport", lambda max_in_flight: transport)
+
+    async def run():
+        task = asyncio.create_task(data_striming.process_segments())
+        await asyncio.wait_for(transport.finished.wait(), 5)
+        # Let the segment be deleted after its last chunk
+        for _ in range(20):
+            if not os.path.exists(tmp_path / segment_name("20260101000000")):
+                break
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+
+def write_segment(tmp_path, n):
+    (tmp_path / segment_name("20260101000000")).write_bytes(b"".join(encode(record(i)) for i in range(n)))
+
+
+def test_failed_chunk_resumes_without_duplicates(tmp_path, monkeypatch):
+    write_segment(tmp_path, 5)
+    transport = FakeTransport(total=5, fail_call=2)
+    deliver(tmp_path, monkeypatch, transport)
+
+    assert transport.accepted == [record(i)["FileName"] for i in range(5)]
+    assert os.listdir(tmp_path) == []
+
+
+def test_restart_resumes_after_delivered_records(tmp_path, monkeypatch):
+    write_segment(tmp_path, 5)
+    (tmp_path / f".{segment_name('20260101000000')}.delivered").write_text("3")
+    transport = FakeTransport(total=2)
+    deliver(tmp_path, monkeypatch, transport)
+
+    assert transport.accepted == [record(3)["FileName"], record(4)["FileName"]]
+    assert os.listdir(tmp_path) == []
+
+
+def test_orphan_progress_is_removed_at_startup(tmp_path, monkeypatch):
+    orphan = tmp_path / f".{segment_name('20251231000000')}.delivered"
+    orphan.write_text("7")
+    write_segment(tmp_path, 1)
+    deliver(tmp_path, monkeypatch, FakeTransport(total=1))
+    assert not orphan.exists()
@@ -0,0 +1,101 @@
+import os
+
+import spool
+from spool import SpoolReader, SpoolWriter
+
+
+def test_roundtrip_and_resume_from_checkpoint(tmp_path):
+    writer = SpoolWriter(tmp_path)
+    assert writer.append_many([{"n": i} for i in range(5)]) == [0, 1, 2, 3, 4]
+
+    reader = SpoolReader(tmp_path, "api")
+    got = reader.read(3)
+    assert got == [(0, {"n": 0}), (1, {"n": 1}), (2, {"n": 2})]
+    reader.commit(got[-1][0] + 1)
+    reader.close()
+
+    # A new reader (restart) continues after the last commit
+    reader = SpoolReader(tmp_path, "api")
+    assert reader.read(10) == [(3, {"n": 3}), (4, {"n": 4})]
+
+
+def test_rewind_rereads_uncommitted(tmp_path):
+    writer = SpoolWriter(tmp_path)
+    writer.append_many([{"n": i} for i in range(3)])
+    reader = SpoolReader(tmp_path, "api")
+    reader.commit(1)
+    reader.read(10)
+    reader.rewind()
+    assert [offset for offset, _ in reader.read(10)] == [1, 2]
+
+
+def test_torn_tail_is_truncated_on_reopen(tmp_path):
+    writer = SpoolWriter(tmp_path)
+    writer.append_many([{"n": 0}, {"n": 1}])
+    writer.close()
+    log = spool._log_path(tmp_path, 0)
+    good = os.path.getsize(log)
+    with open(log, "ab") as f:
+        f.write(b"\x00\x00\x00\x10\xde\xad")          # header of a record that never made it
+
+    assert [r for _, r in SpoolReader(tmp_path, "api").read(10)] == [{"n": 0}, {"n": 1}]
+
+    writer = SpoolWriter(tmp_path)
+    assert os.path.getsize(log) == good
+    assert writer.append({"n": 2}) == 2
+    assert [r["n"] for _, r in SpoolReader(tmp_path, "api").read(10)] == [0, 1, 2]
+
+
+def test_corrupt_record_is_never_delivered(tmp_path):
+    writer = SpoolWriter(tmp_path)
+    writer.append_many([{"n": 0}, {"n": 1}])
+    writer.close()
+    log = spool._log_path(tmp_path, 0)
+    with open(log, "r+b") as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b"!!")                                  # payload no longer matches its CRC
+
+    assert [r for _, r in SpoolReader(tmp_path, "api").read(10)] == [{"n": 0}]
+    writer = SpoolWriter(tmp_path)
+    assert writer.next_offset == 1
+
+
+def test_reads_across_segments(tmp_path):
+    writer = SpoolWriter(tmp_path, segment_max_bytes=40)
+    writer.append_many([{"n": i} for i in range(10)])
+    assert len(spool._segment_bases(tmp_path)) > 1
+    reader = SpoolReader(tmp_path, "api")
+    assert [r["n"] for _, r in reader.read(100)] == list(range(10))
+    # Seeking into a later segment goes through its index
+    reader = SpoolReader(tmp_path, "other")
+    reader.commit(7)
+    reader.rewind()
+    assert [offset for offset, _ in reader.read(100)] == [7, 8, 9]
+
+
+def test_prune_keeps_unacknowledged_and_retries_locked(tmp_path, monkeypatch):
+    writer = SpoolWriter(tmp_path, segment_max_bytes=40)
+    writer.append_many([{"n": i} for i in range(10)])
+    bases = spool._segment_bases(tmp_path)
+    slow = SpoolReader(tmp_path, "slow")
+    fast = SpoolReader(tmp_path, "fast")
+    fast.commit(10)
+    slow.commit(0)
+    assert writer.prune() == 0
+
+    slow.commit(10)
+    locked = spool._log_path(tmp_path, bases[0])
+    real_remove = os.remove
+
+    def remove(path):
+        if path == locked:
+            raise PermissionError(13, "in use")
+        real_remove(path)
+
+    monkeypatch.setattr(spool.os, "remove", remove)
+    assert writer.prune() == len(bases) - 2             # the active segment always stays
+    assert os.path.exists(locked)
+
+    monkeypatch.setattr(spool.os, "remove", real_remove)
+    assert writer.prune() == 1
+    assert spool._segment_bases(tmp_path) == [bases[-1]]